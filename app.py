@@ -1,18 +1,38 @@
 # app.py — organized layout + instant toggles + per-side dashed borders for open ranges
 
+import io
 import uuid
 import hashlib
 import json
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from lib.styles import GLOBAL_CSS
 from lib.state import (
-    normalize_item, normalize_group, normalize_state,
+    normalize_item, normalize_group, normalize_link,
     reset_defaults, export_items_groups
 )
+from lib.roadmap import (
+    PALETTE_MAP, PALETTE_OPTIONS, OPEN_START_SENTINEL, OPEN_END_SENTINEL,
+    date_from_any, soft_style_from_color, open_class_name, enrich_items,
+    compute_auto_height, smart_import_doc
+)
+from lib.validation import validate_doc, summarize, errors_to_csv
+from lib.schedule import (
+    ScheduleCycleError, propagate, would_create_cycle, drop_links_for, annotate_critical
+)
 from lib.timeline import render_timeline
+from lib.static_export import build_static_html
+from lib.poster import write_poster, PAPER_MM
+from lib.recurrence import is_rule, occurrences, set_override
+from lib.archive import RoadmapArchive, pack_json
+from lib.merge import merge_files
+from lib.viewer import render_viewer
+from lib.session_memory import get_memory_manager
+from lib.collab import RoadmapStore, VersionConflict, make_broker, pull_changes
+from lib.snapshots import SnapshotStore, unindex_doc
 
 # ---------- Page & logging ----------
 st.set_page_config(page_title="Roadmap", page_icon="🗺️", layout="wide")
@@ -20,11 +40,29 @@ st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 LOG = logging.getLogger("roadmap")
 
+# ---------- Read-only viewer (?view=<roadmap id>) ----------
+# Served from a process-wide cache; skip all session state and editing widgets.
+if st.query_params.get("view"):
+    render_viewer(st.query_params["view"])
+    st.stop()
+
 # ---------- Session ----------
+def _begin_run():
+    """Reload this session's roadmap if it was spilled while idle; spill others if over budget.
+
+    Called by full runs and by every panel, so fragment-only activity still counts as activity."""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        get_memory_manager().begin(ctx.session_id, ctx.session_state)
+
+_begin_run()
+
 ss = st.session_state
 ss.setdefault("items", [])
 ss.setdefault("groups", [])
+ss.setdefault("links", [])
 ss.setdefault("_last_import_hash", "")
+ss.setdefault("_import_errors", None)
 ss.setdefault("_export_exact", None)
 ss.setdefault("png_include_bg", True)
 
@@ -32,31 +70,58 @@ ss.setdefault("png_include_bg", True)
 ss.setdefault("selected_item_id", "(none)")
 ss.setdefault("_last_prefill_from", "(none)")
 ss.setdefault("_goto_item_id", None)
-
-# ---------- Palette ----------
-PALETTE_MAP = {
-    "Blue":   "#3B82F6",
-    "Green":  "#10B981",
-    "Amber":  "#F59E0B",
-    "Rose":   "#F43F5E",
-    "Purple": "#8B5CF6",
-    "Slate":  "#64748B",
-}
-PALETTE_OPTIONS = list(PALETTE_MAP.keys())
-
-# Color order so Green sits near Blue
-COLOR_RANK = {
-    "#3B82F6": 10,  # Blue
-    "#10B981": 11,  # Green
-    "#F59E0B": 12,  # Amber
-    "#8B5CF6": 13,  # Purple
-    "#F43F5E": 14,  # Rose
-    "#64748B": 15,  # Slate
-}
-
-# Sentinels for open ranges
-OPEN_START_SENTINEL = date(1970, 1, 1)
-OPEN_END_SENTINEL   = date(2100, 1, 1)
+ss.setdefault("_collab_room", "")
+ss.setdefault("_collab_rev", -1)
+ss.setdefault("_dirty_ids", None)      # item ids changed since the last snapshot; None → full diff
+ss.setdefault("_snapshot_head", None)  # (history name, version) the dirty set is relative to
+ss.setdefault("_data_rev", 0)          # bumped on every roadmap change; keys the timeline cache
+
+# ---------- Shared roadmap (collaboration) ----------
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+@st.cache_resource(show_spinner=False)
+def _collab_broker():
+    return make_broker()
+
+@st.cache_resource(show_spinner=False)
+def _collab_get_store(room: str) -> RoadmapStore:
+    return RoadmapStore(room, _collab_broker())
+
+def _collab_store():
+    return _collab_get_store(ss["_collab_room"]) if ss["_collab_room"] else None
+
+def _collab_leave():
+    ss["_collab_room"] = ""
+    ss["_collab_rev"] = -1
+    ss.pop("_edit_base_v", None)
+    for it in ss["items"]:
+        it.pop("_v", None)
+
+# ---------- Snapshots (history) ----------
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _snapshot_store(name: str) -> SnapshotStore:
+    return SnapshotStore(name)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _history_changes(name: str, since_v: int, latest_v: int) -> dict:
+    # latest_v only keys the cache: a new snapshot invalidates the summary
+    return _snapshot_store(name).changes_since(since_v)
+
+def _mark_dirty(ids=None):
+    """Record edited item ids for the next snapshot; no ids → next snapshot diffs everything."""
+    ss["_data_rev"] += 1
+    if ids is None:
+        ss["_dirty_ids"] = None
+    elif ss["_dirty_ids"] is not None:
+        ss["_dirty_ids"].update(str(i) for i in ids)
+
+# Pull what other planners changed since our last run (only changed items are replaced)
+if ss["_collab_room"]:
+    try:
+        if pull_changes(ss, _collab_store()):
+            _mark_dirty()
+    except ConnectionError as e:   # this process has no copy of the room yet and the relay is down
+        st.warning(f"Shared room '{ss['_collab_room']}' unavailable ({e}); showing your last copy.")
 
 # ---------- Helpers ----------
 def _normalize_form_defaults():
@@ -68,20 +133,30 @@ def _normalize_form_defaults():
     ss.setdefault("form_start", date.today())
     ss.setdefault("form_end", date.today())
     ss.setdefault("form_color_label", PALETTE_OPTIONS[0])
+    ss.setdefault("form_repeat_unit", "never")
+    ss.setdefault("form_repeat_every", 1)
+    ss.setdefault("form_repeat_count", 0)
+    ss.setdefault("form_repeat_until", None)
 
 def _prefill_form_from_item(it: dict, groups_by_id: dict):
+    ss["_edit_base_v"] = it.get("_v")   # shared rooms: the version this edit starts from
     ss["form_title"] = it.get("content", "")
     ss["form_subtitle"] = it.get("subtitle", "")
     ss["form_category_name"] = groups_by_id.get(it.get("group", ""), "")
     ss["form_no_start"] = bool(it.get("openStart", False))
     ss["form_no_end"]   = bool(it.get("openEnd", False))
-    ss["form_start"] = _date_from_any(it.get("start")) or date.today()
-    ss["form_end"]   = _date_from_any(it.get("end"))   or ss["form_start"]
+    ss["form_start"] = date_from_any(it.get("start")) or date.today()
+    ss["form_end"]   = date_from_any(it.get("end"))   or ss["form_start"]
     cur_color = it.get("color")
     for label, hexv in PALETTE_MAP.items():
         if hexv == cur_color:
             ss["form_color_label"] = label
             break
+    rep = it.get("repeat") or {}
+    ss["form_repeat_unit"] = rep.get("unit", "never")
+    ss["form_repeat_every"] = rep.get("every", 1)
+    ss["form_repeat_count"] = rep.get("count", 0)
+    ss["form_repeat_until"] = date_from_any(rep.get("until"))
 
 def _ensure_group_id_from_name(name_text: str) -> str:
     name = (name_text or "").strip()
@@ -97,68 +172,20 @@ def _ensure_group_id_from_name(name_text: str) -> str:
 def _label_for_item(it, groups_by_id):
     gname = groups_by_id.get(it.get("group", ""), "")
     title = it.get("content", "(untitled)")
-    start = str(_date_from_any(it.get("start")) or "")[:10]
+    start = str(date_from_any(it.get("start")) or "")[:10]
     short = str(it.get("id", ""))[:6]
+    if is_rule(it):
+        rep = it["repeat"]
+        title = f"🔁 {title} (every {rep['every']} {rep['unit']})"
     return f"{title} · {gname} · {start} · {short}"
 
-def _date_from_any(v):
-    if v is None or v == "":
-        return None
-    if isinstance(v, date) and not isinstance(v, datetime):
-        return v
-    if isinstance(v, datetime):
-        return v.date()
-    if isinstance(v, str):
-        s = v.strip()
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        try:
-            return datetime.fromisoformat(s).date()
-        except Exception:
-            pass
-        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y"):
-            try:
-                return datetime.strptime(s, fmt).date()
-            except Exception:
-                continue
-    return None
-
-def hex_to_rgba(hex_color: str, alpha: float = 0.22) -> str:
-    if not isinstance(hex_color, str):
-        return f"rgba(59,130,246,{alpha})"
-    h = hex_color.lstrip("#")
-    if len(h) == 3:
-        h = "".join([c*2 for c in h])
-    try:
-        r = int(h[0:2], 16); g = int(h[2:4], 16); b = int(h[4:6], 16)
-        return f"rgba({r},{g},{b},{alpha})"
-    except Exception:
-        return f"rgba(59,130,246,{alpha})"
-
-def soft_style_from_color(hex_color: str, open_start: bool = False, open_end: bool = False) -> str:
-    """Pastel fill + black text; dashed only on the open side(s)."""
-    rgba = hex_to_rgba(hex_color, 0.22)
-    # base: solid on all sides
-    css = [
-        f"background:{rgba}",
-        "color:#111",
-        f"border-color:{hex_color}",
-        "border-width:2px",
-        "border-style:solid",
-    ]
-    if open_start:
-        css += ["border-left-style:dashed"]
-    if open_end:
-        css += ["border-right-style:dashed"]
-    return "; ".join(css)
-
 def _build_item_dict(item_id: str) -> dict:
     col_hex = PALETTE_MAP[ss["form_color_label"]]
     gid = _ensure_group_id_from_name(ss.get("form_category_name", ""))
     no_start = bool(ss.get("form_no_start"))
     no_end   = bool(ss.get("form_no_end"))
-    start = _date_from_any(ss.get("form_start")) or date.today()
-    end   = _date_from_any(ss.get("form_end")) or start
+    start = date_from_any(ss.get("form_start")) or date.today()
+    end   = date_from_any(ss.get("form_end")) or start
     if end < start:
         start, end = end, start
 
@@ -175,368 +202,645 @@ def _build_item_dict(item_id: str) -> dict:
         "color": col_hex,
         "openStart": no_start,
         "openEnd": no_end,
-        "className": " ".join([c for c in ["open-start" if no_start else "", "open-end" if no_end else ""] if c]),
+        "className": open_class_name(no_start, no_end),
         "style": soft_style_from_color(col_hex, open_start=no_start, open_end=no_end),
     }
+    unit = ss.get("form_repeat_unit", "never")
+    if unit != "never" and not (no_start or no_end):   # open ranges cannot repeat
+        item["repeat"] = {
+            "unit": unit,
+            "every": int(ss.get("form_repeat_every") or 1),
+            "count": int(ss.get("form_repeat_count") or 0),
+            "until": ss.get("form_repeat_until"),
+        }
     normalized = normalize_item(item)
     for k in ("openStart", "openEnd", "className", "style", "color"):
         normalized[k] = item[k]
     return normalized
 
-# ---- Height helpers ----
-def _as_datetime(d):
-    if isinstance(d, datetime): return d
-    if isinstance(d, date):     return datetime(d.year, d.month, d.day)
-    if isinstance(d, str):
-        s = d.strip()
-        try:
-            if s.endswith("Z"): s = s[:-1] + "+00:00"
-            return datetime.fromisoformat(s)
-        except Exception:
-            return None
-    return None
-
-def _max_overlap(intervals):
-    events = []
-    for s, e in intervals:
-        if s is None: continue
-        if e is None: e = s
-        events.append((s, +1)); events.append((e, -1))
-    events.sort()
-    cur = 0; mx = 0
-    for _, d in events:
-        cur += d; mx = max(mx, cur)
-    return max(1, mx) if events else 1
-
-def compute_auto_height(items, groups, stack=True):
-    group_ids = [g.get("id") for g in groups] or ["_ungrouped"]
-    per_lane, top_pad = 80, 120
-    total = 0
-    for gid in group_ids:
-        ivs = []
-        for it in items:
-            g = it.get("group") or "_ungrouped"
-            if g == gid:
-                s = _as_datetime(it.get("start"))
-                e = _as_datetime(it.get("end") or it.get("start"))
-                ivs.append((s, e))
-        total += _max_overlap(ivs) if stack else 1
-    return max(260, top_pad + per_lane * total)
-
-# ---------- Smart JSON importer ----------
-def smart_import(text: str):
-    doc = json.loads(text)
-
-    def _get_case_insensitive(d: dict, key: str):
-        for k in d.keys():
-            if k.lower() == key.lower():
-                return d[k]
-        return None
-
-    root = doc
-    if isinstance(root, dict) and "data" in {k.lower() for k in root.keys()}:
-        cand = _get_case_insensitive(root, "data")
-        if isinstance(cand, dict):
-            root = cand
-
-    items_in  = _get_case_insensitive(root, "items")
-    groups_in = _get_case_insensitive(root, "groups")
-
-    if items_in is None and isinstance(root, dict):
-        for v in root.values():
-            if isinstance(v, dict):
-                items_in  = items_in  or _get_case_insensitive(v, "items")
-                groups_in = groups_in or _get_case_insensitive(v, "groups")
-
-    if items_in is None:
-        for v in root.values() if isinstance(root, dict) else []:
-            if isinstance(v, list) and v and isinstance(v[0], dict):
-                sample = v[0]
-                if any(k in sample for k in ("content", "title", "name", "start", "startDate")):
-                    items_in = v
-                    break
-
-    if not isinstance(items_in, list):
-        return [], []
-
-    groups_norm, items_norm, name_to_id = [], [], {}
-
-    if isinstance(groups_in, list):
-        for idx, g in enumerate(groups_in):
-            gid = str(g.get("id") or uuid.uuid4())
-            name = g.get("content") or g.get("name") or g.get("title") or f"Group {idx+1}"
-            grp = normalize_group({"id": gid, "content": name, "order": idx})
-            groups_norm.append(grp)
-            name_to_id[(name or "").strip().lower()] = gid
-
-    def _ensure_group_from_item_name(name: str) -> str:
-        nm = (name or "").strip()
-        if not nm: return ""
-        lid = nm.lower()
-        if lid in name_to_id: return name_to_id[lid]
-        gid = str(uuid.uuid4())
-        groups_norm.append(normalize_group({"id": gid, "content": nm, "order": len(groups_norm)}))
-        name_to_id[lid] = gid
-        return gid
-
-    for it in items_in:
-        if not isinstance(it, dict): continue
-        iid = str(it.get("id") or uuid.uuid4())
-        title = it.get("content") or it.get("title") or it.get("name") or "(untitled)"
-        subtitle = it.get("subtitle") or it.get("description") or ""
-        group_id = it.get("group") or it.get("groupId")
-        if not group_id:
-            gname = it.get("category") or it.get("groupName") or it.get("group_name")
-            group_id = _ensure_group_from_item_name(gname) if gname else ""
-        start = _date_from_any(it.get("start") or it.get("startDate"))
-        end   = _date_from_any(it.get("end")   or it.get("endDate")) or start
-        if end and start and end < start:
-            start, end = end, start
-
-        color = it.get("color") or PALETTE_MAP["Blue"]
-        if not color.startswith("#"):
-            color = PALETTE_MAP["Blue"]
-
-        open_start = bool(it.get("openStart", False)) or (start and start <= OPEN_START_SENTINEL)
-        open_end   = bool(it.get("openEnd", False))   or (end   and end   >= OPEN_END_SENTINEL)
-
-        items_norm.append(normalize_item({
-            "id": iid,
-            "content": title,
-            "subtitle": subtitle,
-            "start": start or OPEN_START_SENTINEL if open_start else start,
-            "end":   end   or OPEN_END_SENTINEL   if open_end   else end,
-            "group": group_id,
-            "color": color,
-            "openStart": open_start,
-            "openEnd": open_end,
-            "className": " ".join([c for c in ["open-start" if open_start else "", "open-end" if open_end else ""] if c]),
-            "style": soft_style_from_color(color, open_start=open_start, open_end=open_end),
-        }))
-
-    return items_norm, groups_norm
-
-# ---------- Page ----------
-st.title("🗺️ Product Roadmap")
-
-# Sidebar: Import / Export / Reset
-with st.sidebar:
-    st.header("Data")
-
-    uploaded = st.file_uploader("Import JSON", type=["json"])
-    if uploaded is not None:
-        text = uploaded.read().decode("utf-8", errors="replace")
-        h = hashlib.sha256(text.encode("utf-8")).hexdigest()
-        if h != ss.get("_last_import_hash", ""):
-            ss["_last_import_hash"] = h
-            items_in, groups_in = smart_import(text)
-            if items_in:
-                ss["items"] = items_in
-                ss["groups"] = groups_in
-                ss["_goto_item_id"] = "(none)"
-                ss["_last_prefill_from"] = "(none)"
-                st.success(f"Imported {len(items_in)} items, {len(groups_in)} groups.")
-                st.rerun()
-            else:
-                try:
-                    normalize_state(ss, text)
-                    ss["_goto_item_id"] = "(none)"
-                    ss["_last_prefill_from"] = "(none)"
-                    st.success("Imported using legacy normalizer.")
-                    st.rerun()
-                except Exception:
-                    st.error("Import failed or empty. Expect JSON with an 'items' array (and optionally 'groups').")
-
-    exported = export_items_groups(ss)
-    st.download_button("⬇️ Export JSON", data=exported, file_name="roadmap.json", mime="application/json")
-
-    st.divider()
-    if st.button("Reset (clear all)"):
-        keep_bg = ss.get("png_include_bg", True)
-        reset_defaults(ss)
-        ss["png_include_bg"] = keep_bg
+# ---------- Actions ----------
+def _import_doc(doc):
+    errors = validate_doc(doc)
+    if errors:
+        ss["_import_errors"] = errors
+        return
+    _set_imported(*smart_import_doc(doc))
+
+def _set_imported(items_in, groups_in, links_in):
+    if items_in:
+        ss["items"] = items_in
+        ss["groups"] = groups_in
+        ss["links"] = links_in
+        _collab_leave()   # an import is a new local roadmap, not an edit of the shared one
+        _mark_dirty()
         ss["_goto_item_id"] = "(none)"
         ss["_last_prefill_from"] = "(none)"
+        st.success(f"Imported {len(items_in)} items, {len(groups_in)} groups.")
         st.rerun()
+    else:
+        st.error("Import failed or empty. Expect JSON with an 'items' array (and optionally 'groups').")
 
-# Lookups & defaults
-groups_by_id = {g.get("id"): g.get("content", "") for g in ss["groups"]}
-_normalize_form_defaults()
+def _collab_push(items_changed=(), deleted=None, links=False):
+    """Write local edits to the shared store; False on a version conflict (after a reload) or relay outage."""
+    store = _collab_store()
+    if store is None:
+        return True
+    try:
+        store.merge_groups(ss["groups"])
+        for it in items_changed:
+            if it.get("_v") is None:
+                it["_v"] = store.add(it)
+            else:
+                it["_v"] = store.update(it, it["_v"])
+        if deleted is not None:
+            store.delete(deleted["id"], deleted.get("_v"))
+        if links:
+            store.set_links(ss["links"])
+    except VersionConflict as e:
+        pull_changes(ss, store)
+        _mark_dirty()
+        st.error(f"Not saved — someone else changed this item first ({e}). "
+                 "Their version is loaded; click Save again to overwrite it.")
+        return False
+    except (ConnectionError, ValueError) as e:
+        st.error(f"Not saved — the shared room is unavailable ({e}). Try again in a moment.")
+        return False
+    return True
 
-# Build items map BEFORE rendering the picker
-item_by_id = {str(it.get("id")): it for it in ss["items"]}
-picker_options = ["(none)"] + list(item_by_id.keys())
-
-# Determine selection (no widget key → we control)
-proposed = ss.get("_goto_item_id")
-if proposed is None:
-    proposed = ss.get("selected_item_id", "(none)")
-if proposed not in picker_options:
-    proposed = "(none)"
-ss["_goto_item_id"] = None
-
-default_index = picker_options.index(proposed)
-selected_id = st.selectbox(
-    "Select item to edit",
-    options=picker_options,
-    index=default_index,
-    format_func=lambda v: "(none)" if v == "(none)" else _label_for_item(item_by_id[v], groups_by_id),
-)
-ss["selected_item_id"] = selected_id
-
-# Prefill only when the selection actually changes
-if selected_id != ss.get("_last_prefill_from"):
-    if selected_id != "(none)":
-        _prefill_form_from_item(item_by_id[selected_id], groups_by_id)
-    ss["_last_prefill_from"] = selected_id
-
-# ---- Instant toggles (outside the form so they rerun immediately) ----
-st.markdown("##### Date options")
-opt1, opt2 = st.columns([1, 1])
-with opt1:
-    st.checkbox("No start date (ongoing)", key="form_no_start", help="Show as running from the distant past; start side is dashed.")
-with opt2:
-    st.checkbox("No end date (open-ended)", key="form_no_end", help="Show as continuing into the future; end side is dashed.")
-
-# ---- Organized Edit/Add form ----
-with st.form("item_form", clear_on_submit=False):
-    r1c1, r1c2 = st.columns([2, 2])
-    with r1c1:
-        st.text_input("Title", key="form_title")
-    with r1c2:
-        st.text_input("Subtitle (optional)", key="form_subtitle")
-
-    r2c1, r2c2 = st.columns([2, 2])
-    with r2c1:
-        hint = ", ".join([g["content"] for g in ss["groups"]][:6])
-        st.text_input("Category", key="form_category_name", help=("Existing: " + hint) if hint else None)
-    with r2c2:
-        st.selectbox("Color", PALETTE_OPTIONS, key="form_color_label")
-
-    r3c1, r3c2 = st.columns([2, 2])
-    with r3c1:
-        st.date_input("Start", key="form_start", disabled=ss["form_no_start"])
-    with r3c2:
-        st.date_input("End", key="form_end", disabled=ss["form_no_end"])
-
-    b1, b2, b3 = st.columns(3)
-    with b1:
-        btn_add = st.form_submit_button("Add new", type="primary", use_container_width=True)
-    with b2:
-        btn_save = st.form_submit_button("Save changes", use_container_width=True)
-    with b3:
-        btn_del = st.form_submit_button("Delete", type="secondary", use_container_width=True)
-
-# ---- Actions ----
 def _add_and_goto():
     new_id = str(uuid.uuid4())
-    ss["items"].append(_build_item_dict(new_id))
+    new_item = _build_item_dict(new_id)
+    if not _collab_push([new_item]):
+        return
+    ss["items"].append(new_item)
+    _mark_dirty([new_id])
     ss["_goto_item_id"] = new_id
     st.success("Item added.")
     st.rerun()
 
+def _propagate_from(changed_ids):
+    """Push dependent items after a date change; only the downstream subgraph is visited."""
+    if not ss["links"]:
+        return []
+    by_id = {str(it.get("id")): it for it in ss["items"]}
+    try:
+        moved = propagate(by_id, ss["links"], changed_ids)
+    except ScheduleCycleError as e:
+        st.error(f"Dependencies not applied: {e}")
+        return []
+    if moved:
+        _mark_dirty(moved)
+        st.toast(f"Shifted {len(moved)} dependent item(s).", icon="🔗")
+    return [by_id[m] for m in moved]
+
 def _save_selected():
     target = ss["selected_item_id"]
     updated = False
     for i, it in enumerate(ss["items"]):
         if str(it.get("id")) == target:
-            ss["items"][i] = _build_item_dict(target)
+            new_item = _build_item_dict(target)
+            if ss["_collab_room"]:
+                new_item["_v"] = ss.get("_edit_base_v", it.get("_v"))   # the version this edit started from
+            if "repeat" in new_item and it.get("overrides"):
+                new_item["overrides"] = it["overrides"]             # form edits the rule, not its exceptions
+            if not _collab_push([new_item]):
+                ss["_edit_base_v"] = _collab_store().version_of(target)   # Save again = overwrite
+                return
+            ss["_edit_base_v"] = new_item.get("_v")
+            ss["items"][i] = new_item
+            _mark_dirty([target])
             updated = True
             break
     if updated:
+        _collab_push(_propagate_from([target]))
         st.success("Item updated.")
         st.rerun()
     else:
         ss["items"].append(_build_item_dict(target))
+        _mark_dirty([target])
         ss["_goto_item_id"] = target
         st.info("Selected item not found; created it.")
         st.rerun()
 
-if btn_add:
-    title = (ss["form_title"] or "").strip()
-    if not title:
-        st.warning("Title is required.")
-    else:
-        _add_and_goto()
+def _save_dependencies(target, preds, lag, item_by_id):
+    new_links = [ln for ln in ss["links"] if ln["to"] != target]
+    for p in preds:
+        if would_create_cycle(new_links, p, target):
+            st.error(f"Cannot depend on '{item_by_id[p].get('content', p)}': it already depends on this item (cycle).")
+            return
+        new_links.append(normalize_link({"from": p, "to": target, "lag": lag}))
+    ss["links"] = new_links
+    _mark_dirty([])
+    _collab_push(_propagate_from(preds), links=True)
+    st.success("Dependencies saved.")
+    st.rerun()
 
-if btn_save:
-    title = (ss["form_title"] or "").strip()
-    if not title:
-        st.warning("Title is required.")
+def _rec_window():
+    """Dates recurring rules are expanded for (View options → Recurring items window)."""
+    w = ss.get("rec_window") or ()
+    if len(w) == 2:
+        return w
+    return (date.today() - timedelta(days=90), date.today() + timedelta(days=365))
+
+def _save_override(rule_id, n, fields):
+    for it in ss["items"]:
+        if str(it.get("id")) == rule_id:
+            set_override(it, n, fields)
+            if not _collab_push([it]):
+                return             # conflict: keep the error visible, their version is loaded
+            _mark_dirty([rule_id])
+            break
+    st.rerun()
+
+def _timeline_model(items_view, groups_view, ids):
+    """(enriched, links, height) for the timeline, reused until the data, filter or window change."""
+    window = tuple(_rec_window())
+    key = (ss["_data_rev"], id(ss["items"]), len(ss["items"]), len(ss["links"]), frozenset(ids), window)
+    hit = ss.get("_view_cache")
+    if hit is None or hit[0] != key:
+        enriched = enrich_items(items_view, window=window)
+        links_view = annotate_critical(enriched, ss["links"])
+        hit = ss["_view_cache"] = (key, enriched, links_view, compute_auto_height(enriched, groups_view, stack=True))
+    return hit[1:]
+
+def _prepare_exports():
+    """Build the export files once, on request; dropped again as soon as the roadmap changes."""
+    exported = export_items_groups(ss)
+    ss["_exports"] = {
+        "key": (ss["_data_rev"], id(ss["items"])),
+        "json": exported,
+        "roadmap": pack_json(exported),
+        "html": build_static_html(ss["items"], ss["groups"], links=ss["links"]),
+    }
+
+# ---------- Panels (fragments) ----------
+# Each panel reruns on its own when one of its widgets changes; anything that changes the
+# roadmap (or the selection / an export request, which the timeline shows) calls st.rerun()
+# for a full run. So typing in the form or ticking an export option never rebuilds the timeline.
+
+@_fragment
+def _data_panel():
+    _begin_run()
+    uploads = st.file_uploader("Import JSON or .roadmap", type=["json", "roadmap"], accept_multiple_files=True,
+                               help="Several files are parsed in parallel and merged: groups by name, items by id.")
+    uploaded = uploads[0] if len(uploads) == 1 else None
+    if len(uploads) > 1:
+        st.caption(f"{len(uploads)} files — merged in upload order; the first file wins on duplicate item ids.")
+        if st.button("Merge & import", use_container_width=True):
+            ss["_import_errors"] = None
+            items_in, groups_in, links_in, ss["_merge_report"] = merge_files([(f.name, f.getvalue()) for f in uploads])
+            if any(r["error"] for r in ss["_merge_report"]["files"]):
+                # all or nothing: a half-merged program view is worse than none
+                st.error("Nothing imported — fix the files marked below and merge again.")
+            else:
+                _set_imported(items_in, groups_in, links_in)
+        rep = ss.get("_merge_report")
+        if rep and [r["name"] for r in rep["files"]] == [f.name for f in uploads]:
+            st.dataframe(rep["files"], hide_index=True, use_container_width=True)
+            st.caption(f"{rep['items']} items · {rep['groups']} groups ({rep['groups_merged']} merged by name) · "
+                       f"{rep['duplicates']} duplicate ids ({len(rep['conflicts'])} differing) · "
+                       f"parsed in {rep['parse_wall_ms']:.0f} ms on {rep['workers']} worker(s)")
+    elif uploaded is not None and uploaded.name.lower().endswith(".roadmap"):
+        # binary archive: pick groups / a date range first, only those records get decoded
+        try:
+            ar = RoadmapArchive(uploaded.getvalue())
+            names = {g.get("id"): g.get("content", "") for g in ar.groups()}
+        except ValueError as e:   # ArchiveError, or a damaged record inside the archive
+            st.error(f"Import failed: {e}.")
+        else:
+            st.caption(f"{ar.n_items} items · {len(names)} groups in this archive")
+            pick = st.multiselect("Groups to load (all if empty)", list(names), format_func=lambda g: names[g] or g)
+            ranged = st.checkbox("Only items in a date range")
+            rng = st.date_input("Date range", value=(date.today(), date.today() + timedelta(days=90)),
+                                disabled=not ranged)
+            if st.button("Load archive", use_container_width=True):
+                ss["_import_errors"] = None
+                window = tuple(rng) if ranged and len(rng) == 2 else None
+                try:
+                    doc = ar.to_doc(groups=pick or None, window=window)
+                except ValueError as e:
+                    st.error(f"Import failed: {e}.")
+                else:
+                    _import_doc(doc)
+    elif uploaded is not None:
+        text = uploaded.read().decode("utf-8", errors="replace")
+        h = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if h != ss.get("_last_import_hash", ""):
+            ss["_last_import_hash"] = h
+            ss["_import_errors"] = None
+            try:
+                doc = json.loads(text)
+            except json.JSONDecodeError as e:
+                st.error(f"Import failed: not valid JSON ({e}).")
+            else:
+                _import_doc(doc)
+    # Report stays visible (and downloadable) until the next upload
+    if uploads and ss.get("_import_errors"):
+        st.error("Nothing imported — " + summarize(ss["_import_errors"]))
+        st.download_button(
+            "⬇️ Validation report (CSV)", data=errors_to_csv(ss["_import_errors"]),
+            file_name="import_errors.csv", mime="text/csv",
+        )
+
+    ready = ss.get("_exports")
+    if ready is not None and ready["key"] != (ss["_data_rev"], id(ss["items"])):
+        ready = ss["_exports"] = None   # stale: the roadmap changed since they were built
+    if ready is None:
+        if st.button("📦 Prepare export", use_container_width=True, disabled=not ss["items"],
+                     help="Builds the JSON, .roadmap and static HTML files for download."):
+            _prepare_exports()
+            ready = ss["_exports"]
+    if ready is not None:
+        st.download_button("⬇️ Export JSON", data=ready["json"], file_name="roadmap.json", mime="application/json")
+        st.download_button("⬇️ Export .roadmap", data=ready["roadmap"], file_name="roadmap.roadmap",
+                           mime="application/octet-stream",
+                           help="Compact binary archive; groups or a date range can be loaded without reading the rest.")
+        st.download_button(
+            "⬇️ Export static HTML (CDN-linked)", data=ready["html"],
+            file_name="roadmap.html", mime="text/html",
+            help="Read-only page for viewers. It loads vis-timeline and the font from public CDNs, so viewers "
+                 "need internet access. For a fully offline file use: python -m lib.static_export roadmap.json",
+        )
+
+@_fragment
+def _collab_panel():
+    _begin_run()
+    room_in = st.text_input("Room name", value=ss["_collab_room"], placeholder="e.g. platform-2026",
+                            help="Everyone who joins the same room edits one roadmap. Joining an empty room shares yours.")
+    j1, j2 = st.columns(2)
+    if j1.button("Join", use_container_width=True, disabled=not room_in.strip()):
+        room = room_in.strip()
+        for it in ss["items"]:
+            it.pop("_v", None)
+        try:
+            seeded = _collab_get_store(room).seed(ss["items"], ss["groups"], ss["links"])
+        except (ConnectionError, ValueError) as e:
+            st.error(f"Could not join '{room}': {e}.")
+            return
+        ss["_collab_room"], ss["_collab_rev"] = room, -1
+        pull_changes(ss, _collab_store())
+        _mark_dirty()
+        ss["_goto_item_id"] = "(none)"
+        st.toast(f"Shared your roadmap as '{room}'." if seeded else f"Joined '{room}'.", icon="👥")
+        st.rerun()
+    if j2.button("Leave", use_container_width=True, disabled=not ss["_collab_room"]):
+        _collab_leave()
+        st.rerun()
+
+@_fragment(run_every=2)
+def _collab_watch():
+    # cheap poll: a full rerun only when the room moved past our revision
+    store = _collab_store()
+    if store is not None and store.rev != ss["_collab_rev"]:
+        st.rerun()
+    if _collab_broker().connected:
+        st.caption(f"Live in '{ss['_collab_room']}' · revision {ss['_collab_rev']}")
     else:
-        if ss["selected_item_id"] == "(none)":
+        st.caption(f"⚠️ '{ss['_collab_room']}' · relay unreachable, reconnecting — edits are not saved")
+
+@_fragment
+def _history_panel():
+    _begin_run()
+    # a shared room shares its history; otherwise each session gets its own until renamed
+    ss.setdefault("_history_default", f"roadmap-{uuid.uuid4().hex[:8]}")
+    hist_name = st.text_input("History name", value=ss["_collab_room"] or ss["_history_default"], key="hist_name",
+                              help="Snapshots are stored as small deltas under this name. "
+                                   "Note it down (or pick your own) to find this history again later.").strip()
+    try:
+        hist = _snapshot_store(hist_name)
+    except ValueError:
+        st.caption("Use letters, digits, '-', '_' or '.' in the history name.")
+        return
+    if st.button("📸 Save snapshot", use_container_width=True):
+        head = (hist_name, hist.latest())
+        changed = ss["_dirty_ids"] if ss["_snapshot_head"] == head else None
+        entry = hist.commit(ss["items"], ss["groups"], ss["links"], changed_ids=changed)
+        ss["_dirty_ids"], ss["_snapshot_head"] = set(), (hist_name, hist.latest())
+        if entry is None:
+            st.toast("No changes since the last snapshot.", icon="🕓")
+        else:
+            st.toast(f"Saved version {entry['v']} ({entry['ops']} change(s), {entry['bytes']} bytes).", icon="🕓")
+    versions = hist.versions()
+    if versions:
+        week_ago = hist.version_at(datetime.now() - timedelta(days=7)) or versions[0]["v"]
+        ver_ids = [e["v"] for e in versions]
+        by_v = {e["v"]: e for e in versions}
+        since_v = st.selectbox(
+            "Changes since", ver_ids[::-1], index=ver_ids[::-1].index(week_ago),
+            format_func=lambda v: f"v{v} · {by_v[v]['ts'].replace('T', ' ')}",
+        )
+        ch = _history_changes(hist_name, since_v, hist.latest())
+        st.caption(f"Since v{since_v}: {len(ch['added'])} added · {len(ch['removed'])} removed · "
+                   f"{len(ch['changed'])} changed")
+        for row in (ch["added"][:5] + ch["removed"][:5] + ch["changed"][:10]):
+            mark = "＋" if row in ch["added"] else "－" if row in ch["removed"] else "✎"
+            fields = ", ".join(row.get("fields", {}))
+            st.caption(f"{mark} {row['title'] or row['id']}" + (f" ({fields})" if fields else ""))
+        if st.button(f"Restore v{since_v}", use_container_width=True):
+            items_in, groups_in, links_in = smart_import_doc(unindex_doc(hist.load(since_v)))
+            ss["items"], ss["groups"], ss["links"] = items_in, groups_in, links_in
+            _collab_leave()
+            _mark_dirty()
+            ss["_goto_item_id"] = "(none)"
+            ss["_last_prefill_from"] = "(none)"
+            st.rerun()
+
+@_fragment
+def _picker_panel():
+    _begin_run()
+    groups_by_id = {g.get("id"): g.get("content", "") for g in ss["groups"]}
+    item_by_id = {str(it.get("id")): it for it in ss["items"]}
+    picker_options = ["(none)"] + list(item_by_id.keys())
+
+    # Determine selection (no widget key → we control)
+    proposed = ss.get("_goto_item_id")
+    if proposed is None:
+        proposed = ss.get("selected_item_id", "(none)")
+    if proposed not in picker_options:
+        proposed = "(none)"
+    ss["_goto_item_id"] = None
+
+    default_index = picker_options.index(proposed)
+    selected_id = st.selectbox(
+        "Select item to edit",
+        options=picker_options,
+        index=default_index,
+        format_func=lambda v: "(none)" if v == "(none)" else _label_for_item(item_by_id[v], groups_by_id),
+    )
+    ss["selected_item_id"] = selected_id
+
+    # Prefill only when the selection actually changes; the form and the timeline highlight
+    # live in other panels, so a changed selection is a full run
+    if selected_id != ss.get("_last_prefill_from"):
+        if selected_id != "(none)":
+            _prefill_form_from_item(item_by_id[selected_id], groups_by_id)
+        ss["_last_prefill_from"] = selected_id
+        ctx = get_script_run_ctx()
+        if ctx is not None and ctx.fragment_ids_this_run:
+            st.rerun()
+
+@_fragment
+def _form_panel():
+    _begin_run()
+    # ---- Instant toggles (outside the form so they rerun immediately) ----
+    st.markdown("##### Date options")
+    opt1, opt2, opt3 = st.columns([1, 1, 1])
+    with opt1:
+        st.checkbox("No start date (ongoing)", key="form_no_start", help="Show as running from the distant past; start side is dashed.")
+    with opt2:
+        st.checkbox("No end date (open-ended)", key="form_no_end", help="Show as continuing into the future; end side is dashed.")
+    with opt3:   # enables Every/Times/Until below right away
+        st.selectbox("Repeat", ["never", "day", "week", "month"], key="form_repeat_unit",
+                     format_func={"never": "Does not repeat", "day": "Days", "week": "Weeks", "month": "Months"}.get,
+                     help="Sprints, release trains, rotations: one rule, shown as many items. "
+                          "Use {n} in the title for the occurrence number.")
+
+    # ---- Organized Edit/Add form ----
+    with st.form("item_form", clear_on_submit=False):
+        r1c1, r1c2 = st.columns([2, 2])
+        with r1c1:
+            st.text_input("Title", key="form_title")
+        with r1c2:
+            st.text_input("Subtitle (optional)", key="form_subtitle")
+
+        r2c1, r2c2 = st.columns([2, 2])
+        with r2c1:
+            hint = ", ".join([g["content"] for g in ss["groups"]][:6])
+            st.text_input("Category", key="form_category_name", help=("Existing: " + hint) if hint else None)
+        with r2c2:
+            st.selectbox("Color", PALETTE_OPTIONS, key="form_color_label")
+
+        r3c1, r3c2 = st.columns([2, 2])
+        with r3c1:
+            st.date_input("Start", key="form_start", disabled=ss["form_no_start"])
+        with r3c2:
+            st.date_input("End", key="form_end", disabled=ss["form_no_end"])
+
+        repeat_off = ss["form_repeat_unit"] == "never"
+        r4c2, r4c3, r4c4 = st.columns([1, 1, 2])
+        with r4c2:
+            st.number_input("Every", min_value=1, max_value=365, step=1, key="form_repeat_every", disabled=repeat_off)
+        with r4c3:
+            st.number_input("Times", min_value=0, max_value=100000, step=1, key="form_repeat_count", disabled=repeat_off,
+                            help="0 = no limit (use Until, or keep repeating)")
+        with r4c4:
+            st.date_input("Until (optional)", key="form_repeat_until", disabled=repeat_off)
+
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            btn_add = st.form_submit_button("Add new", type="primary", use_container_width=True)
+        with b2:
+            btn_save = st.form_submit_button("Save changes", use_container_width=True)
+        with b3:
+            btn_del = st.form_submit_button("Delete", type="secondary", use_container_width=True)
+
+    if btn_add:
+        title = (ss["form_title"] or "").strip()
+        if not title:
+            st.warning("Title is required.")
+        else:
             _add_and_goto()
+
+    if btn_save:
+        title = (ss["form_title"] or "").strip()
+        if not title:
+            st.warning("Title is required.")
         else:
-            _save_selected()
+            if ss["selected_item_id"] == "(none)":
+                _add_and_goto()
+            else:
+                _save_selected()
 
-if btn_del:
-    if ss["selected_item_id"] == "(none)":
-        st.warning("Select an item to delete (top dropdown).")
-    else:
-        tgt = ss["selected_item_id"]
-        ss["items"] = [it for it in ss["items"] if str(it.get("id")) != tgt]
+    if btn_del:
+        if ss["selected_item_id"] == "(none)":
+            st.warning("Select an item to delete (top dropdown).")
+        else:
+            tgt = ss["selected_item_id"]
+            current = next((it for it in ss["items"] if str(it.get("id")) == tgt), {"id": tgt})
+            if _collab_push(deleted=current):
+                ss["items"] = [it for it in ss["items"] if str(it.get("id")) != tgt]
+                _mark_dirty([tgt])
+                ss["links"] = drop_links_for(ss["links"], tgt)
+                _collab_push(links=True)
+                ss["_goto_item_id"] = "(none)"
+                st.success("Item deleted.")
+                st.rerun()
+
+@_fragment
+def _item_extras_panel():
+    _begin_run()
+    selected_id = ss["selected_item_id"]
+    item_by_id = {str(it.get("id")): it for it in ss["items"]}
+    if selected_id not in item_by_id:
+        return
+    groups_by_id = {g.get("id"): g.get("content", "") for g in ss["groups"]}
+
+    # ---- Dependencies (finish-to-start) ----
+    with st.expander("🔗 Dependencies"):
+        cur_links = [ln for ln in ss["links"] if ln["to"] == selected_id]
+        with st.form("deps_form", clear_on_submit=False):
+            dep_preds = st.multiselect(
+                "Starts after (finish-to-start)",
+                options=[i for i in item_by_id if i != selected_id],
+                default=[ln["from"] for ln in cur_links if ln["from"] in item_by_id],
+                format_func=lambda v: _label_for_item(item_by_id[v], groups_by_id),
+            )
+            dep_lag = st.number_input("Lag (days)", value=int(cur_links[0]["lag"]) if cur_links else 0, step=1)
+            btn_deps = st.form_submit_button("Save dependencies", use_container_width=True)
+        if btn_deps:
+            _save_dependencies(selected_id, dep_preds, int(dep_lag), item_by_id)
+
+    # ---- Recurring items: per-occurrence exceptions ----
+    if not is_rule(item_by_id[selected_id]):
+        return
+    with st.expander("🔁 Occurrences"):
+        rule = item_by_id[selected_id]
+        shown = {o["occurrence"]: o for o in occurrences(rule, _rec_window())}
+        skipped = sorted(int(n) for n, ov in (rule.get("overrides") or {}).items() if ov.get("skip"))
+        choices = sorted(set(shown) | set(skipped))
+        if not choices:
+            st.caption("No occurrences in the recurring items window (View options).")
+            return
+        occ_n = st.selectbox(
+            "Occurrence", choices,
+            format_func=lambda n: f"#{n} · {shown[n]['content']} · {shown[n]['start']}" if n in shown else f"#{n} · skipped",
+        )
+        occ = shown.get(occ_n) or {"content": "", "subtitle": "", "start": date.today(), "end": date.today()}
+        with st.form(f"occ_form_{selected_id}_{occ_n}", clear_on_submit=False):
+            o_title = st.text_input("Title", value=occ["content"])
+            oc1, oc2 = st.columns(2)
+            o_start = oc1.date_input("Start", value=date_from_any(occ["start"]))
+            o_end = oc2.date_input("End", value=date_from_any(occ["end"]))
+            o_skip = st.checkbox("Skip this occurrence", value=occ_n not in shown)
+            ob1, ob2 = st.columns(2)
+            btn_occ_save = ob1.form_submit_button("Save exception", use_container_width=True)
+            btn_occ_clear = ob2.form_submit_button("Back to the rule", use_container_width=True)
+        if btn_occ_save:
+            # keep only what differs, so later changes to the rule still reach this occurrence
+            edited = {"content": o_title.strip(), "start": o_start, "end": max(o_start, o_end)}
+            changed = {k: v for k, v in edited.items() if v != (date_from_any(occ[k]) if k != "content" else occ[k])}
+            _save_override(selected_id, occ_n, {"skip": True} if o_skip else (changed or None))
+        if btn_occ_clear:
+            _save_override(selected_id, occ_n, None)
+
+@_fragment
+def _png_panel():
+    _begin_run()
+    st.subheader("🎨 Export PNG")
+    st.checkbox("Include background color in PNG", key="png_include_bg")
+    if st.button("Download PNG", use_container_width=True):
+        ss["_export_exact"] = {
+            "kind": "png",
+            "mode": "visible",
+            "includeBg": bool(ss.get("png_include_bg", True)),
+        }
+        st.toast("Exporting PNG…", icon="🖼️")
+        st.rerun()   # the timeline performs the export
+
+@_fragment
+def _poster_panel():
+    _begin_run()
+    with st.expander("🖨️ Poster (SVG / PDF)"):
+        pc1, pc2, pc3 = st.columns([1, 1, 1])
+        poster_fmt = pc1.selectbox("Format", ["PDF", "SVG"], key="poster_fmt")
+        poster_size = pc2.selectbox("Size", list(PAPER_MM) + ["Custom"], index=1, key="poster_size")
+        poster_portrait = pc3.checkbox("Portrait", key="poster_portrait")
+        if poster_size == "Custom":
+            cc1, cc2 = st.columns(2)
+            pw = cc1.number_input("Width (mm)", min_value=50, max_value=100000, value=3000, step=100, key="poster_w")
+            ph = cc2.number_input("Height (mm)", min_value=50, max_value=100000, value=1200, step=100, key="poster_h")
+            poster_size = f"{pw}x{ph}"
+        if st.button("Build poster", use_container_width=True):
+            buf = io.BytesIO()
+            write_poster(buf, ss["items"], ss["groups"], fmt=poster_fmt.lower(), size=poster_size, portrait=poster_portrait)
+            ss["_poster"] = ((ss["_data_rev"], id(ss["items"])), poster_fmt.lower(), buf.getvalue())
+        if ss.get("_poster") and ss["_poster"][0] != (ss["_data_rev"], id(ss["items"])):
+            ss["_poster"] = None   # stale: the roadmap changed since it was built
+        if ss.get("_poster"):
+            _, fmt, data = ss["_poster"]
+            st.download_button(f"⬇️ Download {fmt.upper()} ({len(data) // 1024} KB)", data=data,
+                               file_name=f"roadmap.{fmt}", mime="application/pdf" if fmt == "pdf" else "image/svg+xml",
+                               help="For wall-sized posters use: python -m lib.poster roadmap.json -o roadmap.pdf --size A0")
+
+@_fragment
+def _timeline_panel():
+    # Filter + timeline share a panel: a filter change reruns only this part of the page
+    _begin_run()
+    st.subheader("📂 View options")
+    names = st.multiselect("Filter categories", [g["content"] for g in ss["groups"]], key="filter_categories")
+    ids = {g["id"] for g in ss["groups"] if g["content"] in names} if names else set()
+    items_view  = [i for i in ss["items"]  if not ids or i.get("group", "") in ids]
+    groups_view = [g for g in ss["groups"] if not ids or g["id"] in ids]
+    if any(is_rule(i) for i in items_view):
+        st.date_input("Recurring items window", value=_rec_window(), key="rec_window",
+                      help="Recurring items are only generated for these dates.")
+
+    # Enrich items for render (recurring rules → occurrences; critical path gets a red outline + red arrows)
+    enriched, links_view, height_px = _timeline_model(items_view, groups_view, ids)
+
+    export_req = ss.get("_export_exact")
+    render_timeline(
+        enriched, groups_view,
+        selected_id=ss.get("selected_item_id", ""),
+        export=export_req,
+        stack=True,
+        height_px=height_px,
+        links=links_view,
+    )
+    if export_req is not None:
+        ss["_export_exact"] = None
+
+    # ---- Debug ----
+    with st.expander("Debug"):
+        st.write({
+            "items_count": len(ss["items"]),
+            "groups_count": len(ss["groups"]),
+            "links_count": len(ss["links"]),
+            "selected_item_id": ss.get("selected_item_id"),
+            "_last_prefill_from": ss.get("_last_prefill_from"),
+            "_goto_item_id": ss.get("_goto_item_id"),
+            "auto_height_px": height_px,
+            "first_item": ss["items"][0] if ss["items"] else None,
+            "first_group": ss["groups"][0] if ss["groups"] else None,
+            "session_memory": get_memory_manager().metrics(),
+        })
+
+# ---------- Page ----------
+st.title("🗺️ Product Roadmap")
+_normalize_form_defaults()
+
+# Sidebar: Import / Export / Reset
+with st.sidebar:
+    st.header("Data")
+    _data_panel()
+
+    st.divider()
+    st.subheader("👥 Shared roadmap")
+    _collab_panel()
+    if ss["_collab_room"]:
+        _collab_watch()
+
+    st.divider()
+    st.subheader("🕓 History")
+    _history_panel()
+
+    st.divider()
+    if st.button("Reset (clear all)"):
+        keep_bg = ss.get("png_include_bg", True)
+        reset_defaults(ss)
+        _collab_leave()
+        _mark_dirty()
+        ss["png_include_bg"] = keep_bg
         ss["_goto_item_id"] = "(none)"
-        st.success("Item deleted.")
+        ss["_last_prefill_from"] = "(none)"
         st.rerun()
 
+_picker_panel()
+_form_panel()
+_item_extras_panel()
+
 st.divider()
 
-# ---- PNG export options ----
-st.subheader("🎨 Export PNG")
-st.checkbox("Include background color in PNG", key="png_include_bg")
-if st.button("Download PNG", use_container_width=True):
-    ss["_export_exact"] = {
-        "kind": "png",
-        "mode": "visible",
-        "includeBg": bool(ss.get("png_include_bg", True)),
-    }
-    st.toast("Exporting PNG…", icon="🖼️")
-
-# ---- View options & Timeline ----
-st.subheader("📂 View options")
-names = st.multiselect("Filter categories", [g["content"] for g in ss["groups"]], key="filter_categories")
-ids = {g["id"] for g in ss["groups"] if g["content"] in names} if names else set()
-items_view  = [i for i in ss["items"]  if not ids or i.get("group", "") in ids]
-groups_view = [g for g in ss["groups"] if not ids or g["id"] in ids]
-
-# Enrich items for render
-enriched = []
-for i in items_view:
-    j = dict(i)
-    j["orderKey"] = COLOR_RANK.get(j.get("color", ""), 99)
-    j["style"] = soft_style_from_color(
-        j.get("color", "#3B82F6"),
-        open_start=bool(j.get("openStart")),
-        open_end=bool(j.get("openEnd")),
-    )
-    cls = []
-    if j.get("openStart"): cls.append("open-start")
-    if j.get("openEnd"):   cls.append("open-end")
-    j["className"] = " ".join(cls)
-    enriched.append(j)
-
-height_px = compute_auto_height(enriched, groups_view, stack=True)
-
-export_req = ss.get("_export_exact")
-render_timeline(
-    enriched, groups_view,
-    selected_id=ss.get("selected_item_id", ""),
-    export=export_req,
-    stack=True,
-    height_px=height_px
-)
-if export_req is not None:
-    ss["_export_exact"] = None
-
-# ---- Debug ----
-with st.expander("Debug"):
-    st.write({
-        "items_count": len(ss["items"]),
-        "groups_count": len(ss["groups"]),
-        "selected_item_id": ss.get("selected_item_id"),
-        "_last_prefill_from": ss.get("_last_prefill_from"),
-        "_goto_item_id": ss.get("_goto_item_id"),
-        "auto_height_px": height_px,
-        "first_item": ss["items"][0] if ss["items"] else None,
-        "first_group": ss["groups"][0] if ss["groups"] else None,
-    })
+_png_panel()
+_poster_panel()
+_timeline_panel()
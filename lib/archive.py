@@ -0,0 +1,331 @@
+# lib/archive.py — binary .roadmap container, read through mmap so only the needed part is decoded
+# • Layout (little-endian):
+#     header   64 B   magic "RMAP", version, counts, section offsets
+#     strings         deduplicated UTF-8; everything else refers to (offset, length)
+#     items    72 B   fixed-width records, sorted by (group, start): each group is one contiguous run
+#     groups   32 B   one per group run: id, group JSON, first record, count, first index block
+#     links    40 B   id, from, to, type, lag
+#     index    4 B    per group, the latest end of every block of BLOCK records (date-range index)
+# • A window query binary-searches start ≤ window end inside the group run, skips whole blocks
+#   that end before the window start, and only decodes records that overlap
+# • Lossless with the Export JSON (export_items_groups): every record keeps its original position,
+#   anything that is not a fixed field (repeat, overrides, odd dates) rides along as JSON
+#
+# CLI:
+#   python -m lib.archive pack roadmap.json -o roadmap.roadmap
+#   python -m lib.archive unpack roadmap.roadmap -o roadmap.json
+#   python -m lib.archive info roadmap.roadmap [--group ID ...] [--from 2026-01-01 --to 2026-03-31]
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from datetime import date
+
+from lib.recurrence import series_end
+
+MAGIC = b"RMAP"
+VERSION = 1
+BLOCK = 64
+HEADER = struct.Struct("<4sHHIII5Q")            # magic, version, flags, n_items, n_groups, n_links, 5 offsets
+ITEM = struct.Struct("<12IiiiIII")              # id, content, subtitle, group, color, extra refs; start, end, reach, pos, flags, pad
+GROUP = struct.Struct("<4IIIII")                # id, json refs; first, count, first block, flags
+LINK = struct.Struct("<8IiI")                   # id, from, to, type refs; lag, pad
+
+NO_DATE = -(2 ** 31)
+FOREVER = 2 ** 31 - 1
+F_EXTRA = 1                                     # record has a JSON "extra" string
+G_DECLARED = 1                                  # listed in "groups" (not just referenced by items)
+ITEM_FIELDS = ("id", "content", "subtitle", "group", "color")
+
+class ArchiveError(ValueError):
+    """Not a .roadmap file, a truncated/corrupt one, or one written by a newer version."""
+
+# ---------- write ----------
+class _Strings:
+    def __init__(self):
+        self.buf, self.seen = bytearray(), {}
+
+    def ref(self, s: str):
+        if s not in self.seen:
+            b = s.encode("utf-8")
+            self.seen[s] = (len(self.buf), len(b))
+            self.buf += b
+        return self.seen[s]
+
+def _ordinal(v):
+    """Date string → proleptic ordinal; None when it would not round-trip exactly."""
+    if isinstance(v, str) and len(v) == 10:
+        try:
+            d = date.fromisoformat(v)
+        except ValueError:
+            return None
+        return d.toordinal()
+    return None
+
+def pack(doc: dict) -> bytes:
+    """Export JSON document ({"items", "groups", "links"}) → .roadmap bytes."""
+    items, groups, links = doc.get("items") or [], doc.get("groups") or [], doc.get("links") or []
+    strings = _Strings()
+    gpos = {}
+    for g in groups:
+        gpos.setdefault(str(g.get("id")), len(gpos))
+    lanes = [(str(g.get("id")), g) for g in groups]
+    for it in items:
+        gid = str(it.get("group") or "")
+        if gid not in gpos:
+            gpos[gid] = len(gpos); lanes.append((gid, None))
+
+    rows = []
+    for pos, it in enumerate(items):
+        start, end = _ordinal(it.get("start")), _ordinal(it.get("end"))
+        extra = {k: v for k, v in it.items() if k not in ITEM_FIELDS and k not in ("start", "end")}
+        if start is None and "start" in it:
+            extra["start"] = it["start"]
+        if end is None and "end" in it:
+            extra["end"] = it["end"]
+        if any(not isinstance(it.get(k, ""), str) for k in ITEM_FIELDS):
+            extra["_fields"] = {k: it[k] for k in ITEM_FIELDS if k in it and not isinstance(it[k], str)}
+        reach = end if end is not None else (start if start is not None else NO_DATE)
+        if isinstance(it.get("repeat"), dict):
+            se = series_end({"repeat": it["repeat"], "start": it.get("start"), "end": it.get("end")})
+            reach = se.toordinal() if se else FOREVER
+        flags = F_EXTRA if extra else 0
+        rows.append((gpos[str(it.get("group") or "")], start if start is not None else NO_DATE,
+                     end if end is not None else NO_DATE, reach, pos, flags, it, extra))
+    rows.sort(key=lambda r: (r[0], r[1], r[4]))
+
+    item_bytes, index, group_runs = bytearray(), [], {}
+    for n, (g, start, end, reach, pos, flags, it, extra) in enumerate(rows):
+        refs = []
+        for k in ITEM_FIELDS:
+            v = it.get(k, "")
+            refs += strings.ref(v if isinstance(v, str) else "")
+        refs += strings.ref(json.dumps(extra, separators=(",", ":"), ensure_ascii=False)) if extra else (0, 0)
+        item_bytes += ITEM.pack(*refs, start, end, reach, pos, flags, 0)
+        run = group_runs.setdefault(g, [n, 0, len(index)])
+        if run[1] % BLOCK == 0:
+            index.append(reach)
+        else:
+            index[-1] = max(index[-1], reach)
+        run[1] += 1
+
+    group_bytes = bytearray()
+    for g, (gid, gdoc) in enumerate(lanes):
+        first, count, block = group_runs.get(g, [0, 0, 0])
+        gjson = json.dumps(gdoc, separators=(",", ":"), ensure_ascii=False) if gdoc is not None else ""
+        group_bytes += GROUP.pack(*strings.ref(gid), *strings.ref(gjson), first, count, block,
+                                  G_DECLARED if gdoc is not None else 0)
+    link_bytes = bytearray()
+    for ln in links:
+        refs = []
+        for k in ("id", "from", "to", "type"):
+            refs += strings.ref(str(ln.get(k, "")))
+        link_bytes += LINK.pack(*refs, int(ln.get("lag", 0) or 0), 0)
+    index_bytes = struct.pack(f"<{len(index)}i", *index)
+
+    offsets, off = [], 64
+    for section in (strings.buf, item_bytes, group_bytes, link_bytes, index_bytes):
+        offsets.append(off); off += len(section)
+    head = HEADER.pack(MAGIC, VERSION, 0, len(rows), len(lanes), len(links), *offsets)
+    return b"".join([head.ljust(64, b"\0"), bytes(strings.buf), bytes(item_bytes), bytes(group_bytes),
+                     bytes(link_bytes), index_bytes])
+
+def pack_json(text: str) -> bytes:
+    return pack(json.loads(text))
+
+# ---------- read ----------
+class RoadmapArchive:
+    """Lazy reader over a .roadmap file (mmap) or bytes; nothing is decoded until asked for."""
+    def __init__(self, source):
+        self._file = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.buf = bytes(source)
+        else:
+            self._file = open(source, "rb")
+            try:
+                self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:     # mmap refuses empty files
+                self._file.close(); self._file = None
+                raise ArchiveError("file too short for a .roadmap header") from None
+        try:
+            self._check()
+        except ArchiveError:
+            self.close()
+            raise
+
+    def _check(self) -> None:
+        """Header, then every section and group run must lie inside the file (truncated/corrupt → ArchiveError)."""
+        size = len(self.buf)
+        if size < 64:
+            raise ArchiveError("file too short for a .roadmap header")
+        magic, version, _, self.n_items, self.n_groups, self.n_links, *offs = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ArchiveError("not a .roadmap file")
+        if version > VERSION:
+            raise ArchiveError(f".roadmap version {version} is newer than this app ({VERSION})")
+        self._str, self._items, self._groups, self._links, self._index = offs
+        if not (64 <= self._str <= self._items
+                and self._items + self.n_items * ITEM.size <= self._groups
+                and self._groups + self.n_groups * GROUP.size <= self._links
+                and self._links + self.n_links * LINK.size <= self._index <= size
+                and (size - self._index) % 4 == 0):
+            raise ArchiveError("truncated or corrupt .roadmap file (sections out of range)")
+        n_blocks = (size - self._index) // 4
+        for g in range(self.n_groups):
+            first, count, block = GROUP.unpack_from(self.buf, self._groups + g * GROUP.size)[4:7]
+            if first + count > self.n_items or block + (count + BLOCK - 1) // BLOCK > n_blocks:
+                raise ArchiveError("truncated or corrupt .roadmap file (group run out of range)")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.buf.close(); self._file.close(); self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _s(self, off: int, n: int) -> str:
+        base = self._str + off
+        if base + n > self._items:
+            raise ArchiveError("corrupt .roadmap file (string out of range)")
+        return str(self.buf[base:base + n], "utf-8")
+
+    # ---- groups ----
+    def _group(self, g: int):
+        vals = GROUP.unpack_from(self.buf, self._groups + g * GROUP.size)
+        return self._s(vals[0], vals[1]), vals, vals[7] & G_DECLARED
+
+    def group_ids(self) -> list:
+        """Every lane id in the file, declared groups first (cheap: no group JSON decoded)."""
+        return [self._group(g)[0] for g in range(self.n_groups)]
+
+    def groups(self, only=None) -> list:
+        """Declared group dicts in their original order (optionally only these ids)."""
+        out = []
+        for g in range(self.n_groups):
+            gid, vals, declared = self._group(g)
+            if declared and (only is None or gid in only):
+                out.append(json.loads(self._s(vals[2], vals[3])))
+        return out
+
+    # ---- items ----
+    def _start(self, n: int) -> int:
+        return struct.unpack_from("<i", self.buf, self._items + n * ITEM.size + 48)[0]
+
+    def _item(self, n: int):
+        v = ITEM.unpack_from(self.buf, self._items + n * ITEM.size)
+        buf, base = self.buf, self._str
+        s = lambda i: str(buf[base + v[i]:base + v[i] + v[i + 1]], "utf-8")
+        out = {"id": s(0), "content": s(2), "subtitle": s(4)}
+        if v[12] != NO_DATE:
+            out["start"] = date.fromordinal(v[12]).isoformat()
+        if v[13] != NO_DATE:
+            out["end"] = date.fromordinal(v[13]).isoformat()
+        out["group"], out["color"] = s(6), s(8)
+        if v[16] & F_EXTRA:
+            extra = json.loads(s(10))
+            fields = extra.pop("_fields", None)
+            if fields or "start" in extra or "end" in extra:   # restore the Export JSON key order
+                out.update(fields or {}); out.update(extra)
+                order = ("id", "content", "subtitle", "start", "end", "group", "color")
+                out = {**{k: out.pop(k) for k in order if k in out}, **out}
+            else:
+                out.update(extra)
+        return v[15], out
+
+    def _runs(self, groups=None):
+        for g in range(self.n_groups):
+            gid, vals, _ = self._group(g)
+            if groups is None or gid in groups:
+                yield vals[4], vals[5], vals[6]
+
+    def _window_rows(self, first: int, count: int, block: int, ws: int, we: int):
+        lo, hi = first, first + count          # records with start <= we
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._start(mid) <= we:
+                lo = mid + 1
+            else:
+                hi = mid
+        last = lo
+        for b in range((count + BLOCK - 1) // BLOCK):
+            a = first + b * BLOCK
+            if a >= last:
+                break
+            if struct.unpack_from("<i", self.buf, self._index + (block + b) * 4)[0] < ws:
+                continue                       # whole block ends before the window
+            for n in range(a, min(a + BLOCK, last)):
+                if struct.unpack_from("<i", self.buf, self._items + n * ITEM.size + 56)[0] >= ws:
+                    yield n
+
+    def items(self, groups=None, window=None) -> list:
+        """Item dicts (Export JSON shape) in original order, limited to group ids and/or a
+        (start, end) date window; only matching records are decoded."""
+        ws, we = (window[0].toordinal(), window[1].toordinal()) if window else (None, None)
+        picked = []
+        for first, count, block in self._runs(set(groups) if groups is not None else None):
+            rows = range(first, first + count) if window is None else self._window_rows(first, count, block, ws, we)
+            picked.extend(self._item(n) for n in rows)
+        picked.sort(key=lambda p: p[0])
+        return [it for _, it in picked]
+
+    def links(self, item_ids=None) -> list:
+        out = []
+        for n in range(self.n_links):
+            v = LINK.unpack_from(self.buf, self._links + n * LINK.size)
+            ln = {"id": self._s(v[0], v[1]), "from": self._s(v[2], v[3]), "to": self._s(v[4], v[5]),
+                  "type": self._s(v[6], v[7]), "lag": v[8]}
+            if item_ids is None or (ln["from"] in item_ids and ln["to"] in item_ids):
+                out.append(ln)
+        return out
+
+    def to_doc(self, groups=None, window=None) -> dict:
+        """Export JSON document for everything, or just some groups / a date window."""
+        items = self.items(groups, window)
+        partial = groups is not None or window is not None
+        return {
+            "items": items,
+            "groups": self.groups(set(groups) if groups is not None else None),
+            "links": self.links({it["id"] for it in items} if partial else None),
+        }
+
+def unpack_json(source) -> str:
+    """.roadmap → the same text export_items_groups would produce."""
+    with RoadmapArchive(source) as ar:
+        return json.dumps(ar.to_doc(), indent=2)
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Convert roadmaps between Export JSON and the binary .roadmap format.")
+    ap.add_argument("cmd", choices=["pack", "unpack", "info"])
+    ap.add_argument("src")
+    ap.add_argument("-o", "--out", default=None)
+    ap.add_argument("--group", action="append", default=None, help="info: only this group id (repeatable)")
+    ap.add_argument("--from", dest="date_from", default=None, help="info: window start YYYY-MM-DD")
+    ap.add_argument("--to", dest="date_to", default=None, help="info: window end YYYY-MM-DD")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "pack":
+        with open(args.src, "r", encoding="utf-8") as f:
+            data = pack_json(f.read())
+        with open(args.out or args.src.rsplit(".", 1)[0] + ".roadmap", "wb") as f:
+            f.write(data)
+    elif args.cmd == "unpack":
+        text = unpack_json(args.src)
+        with open(args.out or args.src.rsplit(".", 1)[0] + ".json", "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        window = None
+        if args.date_from or args.date_to:
+            window = (date.fromisoformat(args.date_from or "0001-01-01"), date.fromisoformat(args.date_to or "9999-12-31"))
+        with RoadmapArchive(args.src) as ar:
+            items = ar.items(args.group, window)
+            print(f"{ar.n_items} items, {ar.n_groups} lanes, {ar.n_links} links; selected {len(items)} items")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+# lib/collab.py — shared roadmaps for several planners at once
+# • RoadmapStore: authoritative items for one "room", each with a version ("_v"), plus a change log
+# • Optimistic concurrency: update/delete must quote the version they edited, else VersionConflict
+# • Sessions keep their own copy and pull only the changes since their last revision
+# • A broker fans changes out between processes:
+#     InProcessBroker   – default, single server process
+#     SocketBroker      – client of the relay (python -m lib.collab serve --port 7788)
+# • With the relay, the relay's own store is the single authority: writes are sent to it, it assigns
+#   versions and rejects stale ones, then broadcasts the accepted changes in one order to every
+#   process. A process that subscribes late gets the room's current snapshot first.
+# • A lost relay connection is retried in the background; on reconnect each room takes the relay's
+#   snapshot again, or — if the relay restarted empty — seeds it back from this process's copy
+# • Relay messages are JSON (never pickles) and the connection needs ROADMAP_COLLAB_AUTHKEY
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from multiprocessing.connection import Client, Listener
+
+LOG = logging.getLogger("roadmap.collab")
+
+LOG_SIZE = 5000         # changes kept per room; sessions further behind resync from a snapshot
+REQUEST_TIMEOUT = 15    # seconds a write waits for the relay
+RECONNECT_SECONDS = 2   # retry interval after the relay connection drops
+
+class VersionConflict(Exception):
+    """The item changed (or was deleted) since the caller read it."""
+    def __init__(self, item_id: str, expected, actual):
+        self.item_id, self.expected, self.actual = item_id, expected, actual
+        what = "was deleted" if actual is None else f"is at version {actual}"
+        super().__init__(f"item {item_id} {what}, you edited version {expected}")
+
+# ---------- Wire format (JSON; dates tagged so items round-trip) ----------
+def _default(o):
+    if isinstance(o, (date, datetime)):
+        return {"$date": o.isoformat()}
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+def _hook(d):
+    if len(d) == 1 and "$date" in d:
+        v = d["$date"]
+        return datetime.fromisoformat(v) if len(v) > 10 else date.fromisoformat(v)
+    return d
+
+def _send(conn, lock, msg: dict) -> None:
+    data = json.dumps(msg, default=_default, separators=(",", ":")).encode("utf-8")
+    with lock:
+        conn.send_bytes(data)
+
+def _recv(conn) -> dict:
+    return json.loads(conn.recv_bytes().decode("utf-8"), object_hook=_hook)
+
+# ---------- Brokers ----------
+class InProcessBroker:
+    """Fan-out between stores of one process (one store per room in the app; several in tests)."""
+    remote = False
+    connected = True
+
+    def __init__(self):
+        self._subs = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, room: str, callback) -> None:
+        with self._lock:
+            self._subs.setdefault(room, []).append(callback)
+
+    def publish(self, room: str, event: dict, sender=None) -> None:
+        with self._lock:
+            subs = [cb for cb in self._subs.get(room, []) if cb != sender]
+        for cb in subs:
+            cb(event)
+
+class SocketBroker(InProcessBroker):
+    """Client of the relay: forwards writes to it and applies its accepted changes in relay order.
+
+    A dropped connection is retried every RECONNECT_SECONDS; once back, every room is subscribed
+    again and takes the relay's snapshot (writes meanwhile raise ConnectionError).
+    """
+    remote = True
+
+    def __init__(self, address, authkey: bytes):
+        super().__init__()
+        self._address, self._authkey = address, authkey
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._waiting = {}     # request id → [threading.Event, reply, on_reply]
+        self._conn = None
+        try:
+            self._conn = Client(address, authkey=authkey)
+        except OSError as e:
+            LOG.warning("collab relay %s unreachable (%s); retrying in the background", address, e)
+        threading.Thread(target=self._run, name="collab-broker", daemon=True).start()
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def _call(self, msg: dict, on_reply=None) -> dict:
+        conn = self._conn
+        if conn is None:
+            raise ConnectionError("collab relay not connected (reconnecting)")
+        req = next(self._ids)
+        slot = self._waiting[req] = [threading.Event(), None, on_reply]
+        try:
+            try:
+                _send(conn, self._send_lock, dict(msg, req=req))
+            except OSError as e:
+                raise ConnectionError(f"collab relay connection lost ({e})") from None
+            if not slot[0].wait(REQUEST_TIMEOUT) or slot[1] is None:
+                raise ConnectionError("no answer from the collab relay")
+            return slot[1]
+        finally:
+            self._waiting.pop(req, None)
+
+    def _sub(self, room: str, callbacks, rejoin: bool = False) -> dict:
+        # snapshot applied on the reader thread, before any change that follows it on the wire
+        return self._call({"t": "sub", "room": room}, on_reply=lambda r: [
+            cb(dict(r["snapshot"], op="snapshot", rejoin=rejoin)) for cb in callbacks])
+
+    def subscribe(self, room: str, callback) -> None:
+        """Register callback and hand it the room's current state before any later change."""
+        super().subscribe(room, callback)
+        try:
+            self._sub(room, [callback])
+        except ConnectionError:
+            with self._lock:
+                self._subs[room].remove(callback)
+            raise
+
+    def resync(self, room: str) -> None:
+        """Replace every local store of `room` with the relay's snapshot."""
+        with self._lock:
+            callbacks = list(self._subs.get(room, []))
+        self._sub(room, callbacks)
+
+    def request(self, room: str, op: str, *args):
+        """Run a write on the relay's store; its changes are applied here before this returns."""
+        reply = self._call({"t": "op", "room": room, "op": op, "args": list(args)})
+        if "conflict" in reply:
+            raise VersionConflict(*reply["conflict"])
+        if "error" in reply:
+            raise ValueError(f"collab relay refused {op}: {reply['error']}")
+        return reply.get("result")
+
+    def _rejoin(self) -> None:
+        with self._lock:
+            rooms = {room: list(cbs) for room, cbs in self._subs.items() if cbs}
+        for room, callbacks in rooms.items():
+            try:
+                self._sub(room, callbacks, rejoin=True)
+            except ConnectionError as e:
+                LOG.warning("resubscribing to %s failed: %s", room, e)
+
+    def _run(self) -> None:
+        while True:
+            if self._conn is None:
+                time.sleep(RECONNECT_SECONDS)
+                try:
+                    self._conn = Client(self._address, authkey=self._authkey)
+                except OSError:
+                    continue
+                LOG.info("collab relay reconnected")
+                # blocking calls need this thread to read their replies: resubscribe from another one
+                threading.Thread(target=self._rejoin, name="collab-rejoin", daemon=True).start()
+            try:
+                self._read(self._conn)
+            except (EOFError, OSError):
+                LOG.warning("collab relay connection closed")
+                self._conn = None
+                for slot in list(self._waiting.values()):
+                    slot[0].set()
+
+    def _read(self, conn) -> None:
+        while True:
+            msg = _recv(conn)
+            if msg["t"] == "ev":
+                with self._lock:
+                    subs = list(self._subs.get(msg["room"], []))
+                for cb in subs:
+                    try:
+                        cb(msg["event"])
+                    except Exception as e:
+                        LOG.error("remote change for %s failed: %s", msg["room"], e)
+            elif msg["t"] == "done" and msg.get("req") in self._waiting:
+                slot = self._waiting[msg["req"]]
+                if slot[2] is not None:
+                    slot[2](msg)
+                slot[1] = msg
+                slot[0].set()
+
+_RELAY_OPS = ("seed", "add", "update", "delete", "merge_groups", "set_links")
+
+def serve(address, authkey: bytes) -> None:
+    """Relay: holds the authoritative store of every room and broadcasts accepted changes."""
+    rooms, rooms_lock = {}, threading.Lock()
+    locks = {}   # conn → send lock
+
+    def get_room(name):
+        with rooms_lock:
+            if name not in rooms:
+                broker = InProcessBroker()
+                store = RoadmapStore(name, broker)
+                subs = set()
+                # runs under the store lock, right after each change: every subscriber gets one order
+                broker.subscribe(name, lambda ev, name=name, subs=subs: fan_out(name, subs, ev))
+                rooms[name] = (store, subs)
+            return rooms[name]
+
+    def fan_out(name, subs, event):
+        for c in list(subs):
+            try:
+                _send(c, locks[c], {"t": "ev", "room": name, "event": event})
+            except (OSError, KeyError):
+                subs.discard(c)
+
+    def handle(conn):
+        locks[conn] = threading.Lock()
+        joined = []
+        try:
+            while True:
+                msg = _recv(conn)
+                store, subs = get_room(str(msg.get("room", "")))
+                reply = {"t": "done", "req": msg.get("req")}
+                with store._lock:
+                    if msg.get("t") == "sub":
+                        rev, items, groups, links = store.snapshot()
+                        reply["snapshot"] = {"items": items, "groups": groups, "links": links}
+                        subs.add(conn)
+                        joined.append(subs)
+                    elif msg.get("t") == "op" and msg.get("op") in _RELAY_OPS:
+                        try:
+                            reply["result"] = getattr(store, msg["op"])(*msg.get("args", []))
+                        except VersionConflict as e:
+                            reply["conflict"] = [e.item_id, e.expected, e.actual]
+                        except (TypeError, KeyError, ValueError) as e:
+                            reply["error"] = str(e)
+                    else:
+                        reply["error"] = "unknown request"
+                    _send(conn, locks[conn], reply)
+        except (EOFError, OSError, ValueError):
+            pass
+        finally:
+            for subs in joined:
+                subs.discard(conn)
+            locks.pop(conn, None)
+
+    with Listener(address, authkey=authkey) as listener:
+        LOG.info("collab relay listening on %s", listener.address)
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:   # failed handshake (wrong authkey) must not stop the relay
+                LOG.warning("collab relay rejected a connection: %s", e)
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+# ---------- Store ----------
+class RoadmapStore:
+    def __init__(self, room: str, broker=None):
+        self.room = room
+        self.broker = broker or InProcessBroker()
+        self._lock = threading.RLock()
+        self._items = {}      # id → item (copy, with "_v")
+        self._order = []      # insertion order of ids, for stable snapshots
+        self._tombs = {}      # deleted id → last version (rejects stale remote upserts)
+        self.groups, self.links = [], []
+        self.rev = 0
+        self._log = deque(maxlen=LOG_SIZE)   # (rev, event)
+        self.broker.subscribe(room, self.apply_remote)
+
+    # ---- reads ----
+    def snapshot(self):
+        """(rev, items, groups, links) — copies, safe for a session to mutate."""
+        with self._lock:
+            items = [dict(self._items[i]) for i in self._order if i in self._items]
+            return self.rev, items, [dict(g) for g in self.groups], [dict(ln) for ln in self.links]
+
+    def changes_since(self, rev: int):
+        """(new rev, events) or None when `rev` is too old for the log (caller must resync)."""
+        with self._lock:
+            if rev == self.rev:
+                return self.rev, []
+            if not self._log or self._log[0][0] > rev + 1:
+                return None
+            return self.rev, [ev for r, ev in self._log if r > rev]
+
+    def version_of(self, item_id: str):
+        with self._lock:
+            it = self._items.get(item_id)
+            return it["_v"] if it else None
+
+    # ---- writes (optimistic) ----
+    # With a relay (broker.remote) every write runs on the relay's store, which holds the versions;
+    # its changes reach this store through apply_remote before the call returns.
+    def seed(self, items, groups, links) -> bool:
+        """Fill an empty room; returns False if it already has content."""
+        if self.broker.remote:
+            return self.broker.request(self.room, "seed", list(items), list(groups), list(links))
+        with self._lock:
+            if self._items or self.groups:
+                return False
+            for it in items:
+                self._put(dict(it, _v=1))
+            self._set("groups", groups)
+            self._set("links", links)
+            return True
+
+    def add(self, item: dict) -> int:
+        if self.broker.remote:
+            return self.broker.request(self.room, "add", item)
+        with self._lock:
+            if item["id"] in self._items:
+                raise VersionConflict(item["id"], None, self._items[item["id"]]["_v"])
+            v = self._tombs.pop(item["id"], 0) + 1
+            self._put(dict(item, _v=v))
+            return v
+
+    def update(self, item: dict, expected_version: int) -> int:
+        if self.broker.remote:
+            return self.broker.request(self.room, "update", item, expected_version)
+        with self._lock:
+            cur = self._items.get(item["id"])
+            if cur is None or cur["_v"] != expected_version:
+                raise VersionConflict(item["id"], expected_version, cur["_v"] if cur else None)
+            v = expected_version + 1
+            self._put(dict(item, _v=v))
+            return v
+
+    def delete(self, item_id: str, expected_version: int) -> None:
+        if self.broker.remote:
+            return self.broker.request(self.room, "delete", item_id, expected_version)
+        with self._lock:
+            cur = self._items.get(item_id)
+            if cur is None or cur["_v"] != expected_version:
+                raise VersionConflict(item_id, expected_version, cur["_v"] if cur else None)
+            self._drop(item_id, expected_version + 1)
+
+    def merge_groups(self, groups) -> None:
+        """Add groups this room does not know yet (groups are never edited or removed in the app)."""
+        if self.broker.remote:
+            return self.broker.request(self.room, "merge_groups", list(groups))
+        with self._lock:
+            known = {g.get("id") for g in self.groups}
+            new = [g for g in groups if g.get("id") not in known]
+            if new:
+                self._set("groups", self.groups + new)
+
+    def set_links(self, links) -> None:
+        if self.broker.remote:
+            return self.broker.request(self.room, "set_links", list(links))
+        with self._lock:
+            self._set("links", links)
+
+    # ---- internals (lock held) ----
+    def _record(self, event: dict, remote: bool) -> None:
+        self.rev += 1
+        self._log.append((self.rev, event))
+        if not remote:
+            self.broker.publish(self.room, event, sender=self.apply_remote)
+
+    def _put(self, item: dict, remote: bool = False) -> None:
+        if item["id"] not in self._items:
+            self._order.append(item["id"])
+        self._items[item["id"]] = item
+        self._record({"op": "upsert", "id": item["id"], "v": item["_v"], "item": dict(item)}, remote)
+
+    def _drop(self, item_id: str, v: int, remote: bool = False) -> None:
+        self._items.pop(item_id, None)
+        self._tombs[item_id] = v
+        if len(self._order) > 2 * len(self._items) + 64:
+            self._order = [i for i in self._order if i in self._items]
+        self._record({"op": "delete", "id": item_id, "v": v}, remote)
+
+    def _set(self, kind: str, rows, remote: bool = False) -> None:
+        setattr(self, kind, [dict(r) for r in rows])
+        self._record({"op": kind, kind: [dict(r) for r in rows]}, remote)
+
+    def apply_remote(self, event: dict) -> None:
+        with self._lock:
+            op = event["op"]
+            if op == "snapshot":
+                if event.get("rejoin") and not (event["items"] or event["groups"]) and (self._items or self.groups):
+                    # the relay restarted empty: give it our copy instead of wiping ours
+                    threading.Thread(target=self._reseed, name="collab-reseed", daemon=True).start()
+                    return
+                # the room as the relay holds it: replace everything, sessions resync in full
+                self._items = {it["id"]: dict(it) for it in event["items"]}
+                self._order = list(self._items)
+                self._tombs = {}
+                self.groups = [dict(g) for g in event["groups"]]
+                self.links = [dict(ln) for ln in event["links"]]
+                self._log.clear()
+                self.rev += 1
+                return
+            if op in ("groups", "links"):
+                self._set(op, event[op], remote=True)
+                return
+            if not self.broker.remote:
+                # in-process peers: ignore changes this store already has
+                cur = self._items.get(event["id"])
+                local_v = cur["_v"] if cur else self._tombs.get(event["id"], 0)
+                if event["v"] <= local_v:
+                    return
+            if op == "upsert":
+                self._tombs.pop(event["id"], None)
+                self._put(dict(event["item"]), remote=True)
+            elif op == "delete":
+                self._drop(event["id"], event["v"], remote=True)
+
+    def _reseed(self) -> None:
+        _, items, groups, links = self.snapshot()
+        try:
+            if not self.seed([{k: v for k, v in it.items() if k != "_v"} for it in items], groups, links):
+                self.broker.resync(self.room)   # another process re-seeded first: take theirs
+        except (ConnectionError, ValueError) as e:
+            LOG.warning("re-seeding room %s failed: %s", self.room, e)
+
+# ---------- Session sync ----------
+def pull_changes(state, store: RoadmapStore) -> int:
+    """Bring a session's items/groups/links up to the store revision; only changed items are touched.
+
+    Returns the number of events applied (-1 for a full resync).
+    """
+    res = store.changes_since(state.get("_collab_rev", -1))
+    if res is None:
+        rev, items, groups, links = store.snapshot()
+        state["items"], state["groups"], state["links"], state["_collab_rev"] = items, groups, links, rev
+        return -1
+    rev, events = res
+    if events:
+        items = state["items"]
+        pos = {str(it.get("id")): n for n, it in enumerate(items)}
+        deleted = set()
+        for ev in events:
+            op = ev["op"]
+            if op in ("groups", "links"):
+                state[op] = [dict(r) for r in ev[op]]
+            elif op == "upsert":
+                if ev["id"] in pos:
+                    items[pos[ev["id"]]] = dict(ev["item"])
+                else:
+                    pos[ev["id"]] = len(items); items.append(dict(ev["item"]))
+                deleted.discard(ev["id"])
+            elif op == "delete":
+                deleted.add(ev["id"])
+        if deleted:
+            state["items"] = [it for it in items if str(it.get("id")) not in deleted]
+    state["_collab_rev"] = rev
+    return len(events)
+
+def make_broker(spec: str | None = None):
+    """"" → InProcessBroker; "host:port" → SocketBroker on the local relay."""
+    spec = spec if spec is not None else os.environ.get("ROADMAP_COLLAB_BROKER", "")
+    if not spec:
+        return InProcessBroker()
+    host, _, port = spec.rpartition(":")
+    return SocketBroker((host or "127.0.0.1", int(port)), _authkey())
+
+def _authkey() -> bytes:
+    """Shared secret for the relay; there is deliberately no default."""
+    key = os.environ.get("ROADMAP_COLLAB_AUTHKEY", "")
+    if not key:
+        raise RuntimeError("set ROADMAP_COLLAB_AUTHKEY (same value for the relay and every app process) "
+                           "before using the collab relay")
+    return key.encode("utf-8")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Roadmap collaboration relay (local socket broker).")
+    ap.add_argument("cmd", choices=["serve"])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7788)
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        authkey = _authkey()
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    serve((args.host, args.port), authkey)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
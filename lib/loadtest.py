@@ -0,0 +1,193 @@
+# lib/loadtest.py — concurrent-session load test for app.py (headless, streamlit.testing AppTest)
+# • N simulated sessions per concurrency level, each in its own worker process
+#   (AppTest swaps Streamlit's global runtime on every run, so sessions cannot share a process)
+# • Each session seeds a synthetic roadmap and repeats a scripted action mix:
+#     import  – validate + smart_import a synthetic JSON document into the session, rerun
+#               (AppTest cannot drive st.file_uploader, so the upload handler's work is done directly)
+#     select  – pick a random item in the picker
+#     edit    – change the title in the form and Save changes
+#     filter  – filter to a random subset of categories
+#     export  – press Download PNG
+# • Reports rerun latency percentiles per action, throughput (reruns/s), the session's pickled state and
+#   how much the worker's RSS grew after the app's first run (≈ what one session costs)
+# • Limitation: every session has its own process (own GIL, caches, memory manager and collab store),
+#   so this measures the app's per-rerun cost under CPU contention — not how many users one
+#   `streamlit run` server can hold; levels above the CPU count mostly measure oversubscription
+#
+#   python -m lib.loadtest --levels 1,2,4,8 --items 2000 --rounds 3
+
+import argparse
+import json
+import os
+import pickle
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ACTIONS = ("import", "select", "edit", "filter", "export")
+PALETTE = ("#3B82F6", "#10B981", "#F59E0B", "#F43F5E", "#8B5CF6", "#64748B")
+
+def synthetic_roadmap(n_items: int, n_groups: int = 8, seed: int = 0) -> dict:
+    """Export-format roadmap with overlapping ranges spread over ~2 years."""
+    rnd = random.Random(seed)
+    groups = [{"id": f"g{g}", "content": f"Team {g + 1}", "order": g} for g in range(n_groups)]
+    items = []
+    for n in range(n_items):
+        start = 20000 + rnd.randint(0, 700)             # days since epoch (2024–2026)
+        length = rnd.randint(3, 90)
+        items.append({
+            "id": f"item-{n}",
+            "content": f"Item {n}",
+            "subtitle": f"Synthetic #{n}",
+            "start": time.strftime("%Y-%m-%d", time.gmtime(start * 86400)),
+            "end":   time.strftime("%Y-%m-%d", time.gmtime((start + length) * 86400)),
+            "group": f"g{rnd.randrange(n_groups)}",
+            "color": rnd.choice(PALETTE),
+        })
+    return {"items": items, "groups": groups}
+
+def _by_label(elements, label):
+    for el in elements:
+        if el.label == label:
+            return el
+    raise LookupError(f"widget {label!r} not found")
+
+def _do(at, action: str, doc: dict, rnd: random.Random) -> None:
+    from lib.roadmap import smart_import_doc
+    from lib.validation import validate_doc
+    if action == "import":
+        validate_doc(doc)
+        items, groups, links = smart_import_doc(doc)
+        at.session_state["items"], at.session_state["groups"], at.session_state["links"] = items, groups, links
+        at.run()
+    elif action == "select":
+        ids = [str(it["id"]) for it in at.session_state["items"]]
+        _by_label(at.selectbox, "Select item to edit").select(rnd.choice(ids)).run()
+    elif action == "edit":
+        at.text_input(key="form_title").set_value(f"Edited {rnd.randrange(10**6)}")
+        _by_label(at.button, "Save changes").click().run()
+    elif action == "filter":
+        ms = _by_label(at.multiselect, "Filter categories")
+        ms.set_value(rnd.sample(list(ms.options), k=rnd.randint(0, min(3, len(ms.options))))).run()
+    elif action == "export":
+        _by_label(at.button, "Download PNG").click().run()
+    else:
+        raise ValueError(f"unknown action {action!r}")
+    if at.exception:
+        raise RuntimeError(f"{action}: {at.exception[0].message}")
+
+def _rss_kb():
+    """Current (not peak) resident set size; None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _session(args) -> dict:
+    """One simulated user: warm up, wait for the others, then run the action script."""
+    session_no, n_items, rounds, actions, barrier, timeout = args
+    from streamlit.testing.v1 import AppTest
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    rnd = random.Random(session_no)
+    doc = synthetic_roadmap(n_items, seed=session_no)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    rss_base = _rss_kb()                               # app imported and run once, no roadmap yet
+    _do(at, "import", doc, rnd)                        # every session starts with its roadmap loaded
+    barrier.wait()
+
+    lat = {a: [] for a in actions}
+    errors = []
+    t_start = time.perf_counter()
+    for _ in range(rounds):
+        for a in actions:
+            t0 = time.perf_counter()
+            try:
+                _do(at, a, doc, rnd)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            lat[a].append((time.perf_counter() - t0) * 1000)
+    wall = time.perf_counter() - t_start
+    state = {k: at.session_state[k] for k in ("items", "groups", "links")}
+    rss_end = _rss_kb()
+    return {
+        "session_rss_kb": rss_end - rss_base if rss_base is not None and rss_end is not None else None,
+        "latency_ms": lat,
+        "wall_s": wall,
+        "state_bytes": len(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "errors": errors,
+    }
+
+def _pct(values, p):
+    if not values:
+        return None
+    v = sorted(values)
+    return round(v[min(len(v) - 1, int(p * len(v)))], 1)
+
+def run_level(n_sessions: int, n_items: int, rounds: int, actions, timeout: float = 120) -> dict:
+    with Manager() as mgr, ProcessPoolExecutor(max_workers=n_sessions) as pool:
+        barrier = mgr.Barrier(n_sessions)
+        t0 = time.perf_counter()
+        results = list(pool.map(_session, [(i, n_items, rounds, actions, barrier, timeout) for i in range(n_sessions)]))
+        wall = time.perf_counter() - t0
+    all_lat = [ms for r in results for v in r["latency_ms"].values() for ms in v]
+    busy = max(r["wall_s"] for r in results)
+    return {
+        "sessions": n_sessions,
+        "items": n_items,
+        "reruns": len(all_lat),
+        "throughput_rps": round(len(all_lat) / busy, 2) if busy else None,
+        "p50_ms": _pct(all_lat, 0.50),
+        "p95_ms": _pct(all_lat, 0.95),
+        "p99_ms": _pct(all_lat, 0.99),
+        "by_action_p50_ms": {a: _pct([ms for r in results for ms in r["latency_ms"][a]], 0.50) for a in actions},
+        "by_action_p95_ms": {a: _pct([ms for r in results for ms in r["latency_ms"][a]], 0.95) for a in actions},
+        "session_state_kb": round(sum(r["state_bytes"] for r in results) / len(results) / 1024, 1),
+        "session_rss_mb": (round(sum(r["session_rss_kb"] for r in results) / len(results) / 1024, 1)
+                           if all(r["session_rss_kb"] is not None for r in results) else None),
+        "worker_max_rss_mb": round(max(r["max_rss_kb"] for r in results) / 1024, 1),   # whole process, peak
+        "errors": sum(len(r["errors"]) for r in results),
+        "level_wall_s": round(wall, 2),
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Drive app.py with N concurrent headless sessions and report rerun latency.")
+    ap.add_argument("--levels", default="1,2,4,8", help="comma-separated concurrency levels (default 1,2,4,8)")
+    ap.add_argument("--items", type=int, default=1000, help="synthetic items per session (default 1000)")
+    ap.add_argument("--rounds", type=int, default=3, help="passes over the action script per session (default 3)")
+    ap.add_argument("--actions", default=",".join(ACTIONS), help="action script (default %(default)s)")
+    ap.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    ap.add_argument("--json", default=None, help="also write the results to this file")
+    args = ap.parse_args(argv)
+
+    actions = tuple(a.strip() for a in args.actions.split(",") if a.strip())
+    unknown = set(actions) - set(ACTIONS)
+    if unknown:
+        ap.error(f"unknown action(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    print(f"note: each session runs in its own process ({os.cpu_count()} CPU(s) here); this is per-rerun cost under "
+          "CPU contention, not the capacity of one streamlit server.")
+    print(f"{'sessions':>8} {'reruns':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'state KB':>9} "
+          f"{'sess MB':>8} {'peak RSS':>9} {'errors':>6}")
+    for level in [int(x) for x in args.levels.split(",") if x.strip()]:
+        r = run_level(level, args.items, args.rounds, actions, args.timeout)
+        results.append(r)
+        print(f"{r['sessions']:>8} {r['reruns']:>7} {r['throughput_rps']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['session_state_kb']:>9} {str(r['session_rss_mb']):>8} {r['worker_max_rss_mb']:>9} "
+              f"{r['errors']:>6}")
+        print("         p95 by action: " + ", ".join(f"{a}={v}" for a, v in r["by_action_p95_ms"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# lib/merge.py — import several team roadmaps at once and merge them into one program view
+# • Each file (Export JSON, any shape smart_import accepts, or .roadmap) is validated, parsed and
+#   normalized in its own worker process — parsing is CPU-bound Python, so threads would serialize
+# • The pool is used only when the files total ≥ POOL_MIN_BYTES (parsing runs ~0.1 s/MB, starting
+#   workers ~0.7 s); it is started once and reused by later merges in the same process
+# • Merge, in file order:
+#     groups  – same name (case-folded) = same group; the first file's id wins, items are remapped
+#     items   – de-duplicated by id; the first file wins, later copies are counted (and flagged when
+#               they differ)
+#     links   – union by id, kept when both ends survived
+# • Every file reports its own parse time; the merge reports counts and wall time
+#
+# CLI:
+#   python -m lib.merge team-a.json team-b.json team-c.roadmap -o program.json [--workers 4]
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from lib.archive import ArchiveError, RoadmapArchive
+from lib.roadmap import smart_import_doc
+from lib.state import export_item, export_items_groups
+from lib.validation import summarize, validate_doc
+
+LOG = logging.getLogger("roadmap.merge")
+
+POOL_MIN_BYTES = 8 * 1024 * 1024   # below this, parsing in-process beats starting/feeding workers
+
+_pool, _pool_workers = None, 0
+_pool_lock = threading.Lock()
+
+def parse_file(name: str, data: bytes) -> dict:
+    """Validate + normalize one file (runs in a worker). Never raises: problems go in "error"."""
+    t0 = time.perf_counter()
+    out = {"name": name, "items": [], "groups": [], "links": [], "error": None}
+    try:
+        if name.lower().endswith(".roadmap"):
+            with RoadmapArchive(data) as ar:
+                doc = ar.to_doc()
+        else:
+            doc = json.loads(data.decode("utf-8", errors="replace"))
+        errors = validate_doc(doc)
+        if errors:
+            out["error"] = summarize(errors, limit=3)
+        else:
+            out["items"], out["groups"], out["links"] = smart_import_doc(doc)
+    except (ArchiveError, json.JSONDecodeError) as e:
+        out["error"] = str(e)
+    except Exception as e:   # anything else in one damaged file fails that file, not the merge
+        out["items"], out["groups"], out["links"] = [], [], []
+        out["error"] = f"{type(e).__name__}: {e}"
+    out["parse_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return out
+
+def pool_size(files, workers: int | None = None) -> int:
+    """Worker processes parse_files will use: 1 (in-process) for small inputs or an explicit --workers 1."""
+    if workers is None and sum(len(d) for _, d in files) < POOL_MIN_BYTES:
+        return 1
+    return max(1, min(len(files), workers or os.cpu_count() or 1))
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide pool, (re)started only when a merge needs more workers than it has."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: safe from inside a threaded server (Streamlit); workers only import lib.*
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def parse_files(files, workers: int | None = None) -> list:
+    """[(name, bytes)] → parse_file results in input order, on a process pool when it pays off."""
+    global _pool
+    workers = pool_size(files, workers)
+    if workers <= 1:
+        return [parse_file(n, d) for n, d in files]
+    pool = _get_pool(workers)
+    try:
+        return list(pool.map(parse_file, [n for n, _ in files], [d for _, d in files]))
+    except BrokenProcessPool as e:   # a worker died: drop the pool so the next merge starts a fresh one
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        LOG.warning("merge worker pool broke (%s); parsing in-process", e)
+        return [parse_file(n, d) for n, d in files]
+    except RuntimeError as e:        # another merge replaced (shut down) the pool before we submitted
+        LOG.info("merge worker pool was replaced (%s); parsing in-process", e)
+        return [parse_file(n, d) for n, d in files]
+
+def merge(results) -> tuple:
+    """Merge parsed files → (items, groups, links, report)."""
+    groups, by_name, items, seen, links, link_ids = [], {}, [], {}, [], set()
+    report = {"files": [], "duplicates": 0, "conflicts": [], "groups_merged": 0}
+    for res in results:
+        row = {k: res.get(k) for k in ("name", "parse_ms", "error")}
+        row.update(items=len(res["items"]), groups=len(res["groups"]), links=len(res["links"]))
+        report["files"].append(row)
+        if res["error"]:
+            continue
+        gmap = {}
+        for g in res["groups"]:
+            key = (g.get("content") or "").strip().casefold()
+            if key in by_name:
+                gmap[g["id"]] = by_name[key]
+                report["groups_merged"] += 1
+            else:
+                gid = g["id"] if all(x["id"] != g["id"] for x in groups) else f"{g['id']}-{len(groups)}"
+                by_name[key] = gmap[g["id"]] = gid
+                groups.append(dict(g, id=gid, order=len(groups)))
+        for it in res["items"]:
+            it["group"] = gmap.get(it.get("group"), it.get("group", ""))
+            prev = seen.get(it["id"])
+            if prev is None:
+                seen[it["id"]] = it
+                items.append(it)
+                continue
+            report["duplicates"] += 1
+            if export_item(prev) != export_item(it):
+                report["conflicts"].append({"id": it["id"], "file": res["name"], "kept": prev.get("content", "")})
+        for ln in res["links"]:
+            if ln["id"] not in link_ids and ln["from"] in seen and ln["to"] in seen:
+                link_ids.add(ln["id"])
+                links.append(ln)
+    report.update(items=len(items), groups=len(groups), links=len(links))
+    return items, groups, links, report
+
+def merge_files(files, workers: int | None = None) -> tuple:
+    """[(name, bytes)] → (items, groups, links, report) with per-file and total timings."""
+    t0 = time.perf_counter()
+    results = parse_files(files, workers)
+    t1 = time.perf_counter()
+    items, groups, links, report = merge(results)
+    report["parse_wall_ms"] = round((t1 - t0) * 1000, 1)
+    report["merge_ms"] = round((time.perf_counter() - t1) * 1000, 1)
+    report["workers"] = pool_size(files, workers)
+    return items, groups, links, report
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Merge several roadmap files (JSON or .roadmap) into one Export JSON.")
+    ap.add_argument("src", nargs="+", help="roadmap files, merged in this order (first file wins on duplicates)")
+    ap.add_argument("-o", "--out", default="merged.json")
+    ap.add_argument("--workers", type=int, default=None, help=f"worker processes (default: in-process below {POOL_MIN_BYTES >> 20} MB total, "
+                    "else one per file up to CPU count)")
+    ap.add_argument("--report", default=None, help="also write the merge report as JSON")
+    args = ap.parse_args(argv)
+
+    files = []
+    for path in args.src:
+        with open(path, "rb") as f:
+            files.append((os.path.basename(path), f.read()))
+    items, groups, links, report = merge_files(files, args.workers)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(export_items_groups({"items": items, "groups": groups, "links": links}))
+
+    print(f"{'file':<32} {'items':>7} {'groups':>6} {'links':>6} {'parse ms':>9}  status")
+    for r in report["files"]:
+        print(f"{r['name'][:32]:<32} {r['items']:>7} {r['groups']:>6} {r['links']:>6} {r['parse_ms']:>9}  {r['error'] or 'ok'}")
+    print(f"merged: {report['items']} items, {report['groups']} groups ({report['groups_merged']} merged by name), "
+          f"{report['links']} links; {report['duplicates']} duplicate ids ({len(report['conflicts'])} differing); "
+          f"parse {report['parse_wall_ms']} ms on {report['workers']} worker(s), merge {report['merge_ms']} ms")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(r["error"] for r in report["files"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
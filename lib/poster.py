@@ -0,0 +1,349 @@
+# lib/poster.py — server-side vector poster export (SVG or PDF) for wall-sized roadmaps
+# • Layout comes from the data, not the browser: time axis = initial_window(), one lane per group,
+#   items stacked in a lane like vis-timeline does (orderKey, then start; first row that is free)
+# • Elements are written to the output file lane by lane as they are drawn; the layout keeps only
+#   a row number per item (no raster, no DOM), so memory does not depend on the poster size
+# • Same look as the timeline: pastel fill (color at 22% opacity), 2px border in the item color,
+#   dashed on the open side(s) — see soft_style_from_color()
+# • PDF is written directly (no dependency): one page, Helvetica, Flate-compressed content stream
+#   emitted through zlib.compressobj; pages past the 200in PDF limit use /UserUnit
+#
+# CLI:
+#   python -m lib.poster roadmap.json -o roadmap.pdf --size A0 [--portrait]
+#   python -m lib.poster roadmap.json -o wall.svg --size 3000x1200     (millimetres)
+
+import argparse
+import bisect
+import functools
+import logging
+import math
+import sys
+import zlib
+from datetime import date
+from xml.sax.saxutils import escape
+
+from lib.recurrence import expand_items
+from lib.roadmap import COLOR_RANK, as_datetime, initial_window, smart_import_all
+
+LOG = logging.getLogger("roadmap.poster")
+
+MM = 72 / 25.4                      # points per millimetre
+PAPER_MM = {"A0": (1189, 841), "A1": (841, 594), "A2": (594, 420), "A3": (420, 297), "A4": (297, 210)}
+FILL_ALPHA = 0.22                   # same as hex_to_rgba() in soft_style_from_color
+TEXT = "#111111"
+GRID = "#E7E9F2"
+LABEL_W_FRAC = 0.12                 # lane label column, share of the width
+AXIS_H_FRAC = 0.05
+MAX_ROW_PT = 42
+
+# ---------- size ----------
+def parse_size(spec: str, portrait: bool = False):
+    """'A1' or '1200x800' (mm) → (width_pt, height_pt); paper sizes are landscape unless portrait."""
+    spec = spec.strip().upper()
+    if spec in PAPER_MM:
+        w, h = PAPER_MM[spec]
+        if portrait:
+            w, h = h, w
+    else:
+        try:
+            w, h = (float(v) for v in spec.replace("MM", "").split("X"))
+        except ValueError:
+            raise ValueError(f"poster size must be A0–A4 or <width>x<height> in mm, got {spec!r}")
+    if w <= 0 or h <= 0:
+        raise ValueError("poster size must be positive")
+    return w * MM, h * MM
+
+# ---------- layout ----------
+@functools.lru_cache(maxsize=256)
+def _hex_rgb(hex_color: str):
+    h = (hex_color or "#3B82F6").lstrip("#")
+    if len(h) == 3:
+        h = "".join(c * 2 for c in h)
+    try:
+        return tuple(int(h[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return (59 / 255, 130 / 255, 246 / 255)
+
+def _day(v):
+    d = as_datetime(v)
+    return d.toordinal() + (d.hour * 3600 + d.minute * 60 + d.second) / 86400 if d else None
+
+def _lanes(items, groups):
+    """[(label, items)] in group order, plus an "Other" lane for items with an unknown group.
+
+    Lanes hold references to the caller's item dicts, nothing is copied.
+    """
+    by_group = {g.get("id"): [] for g in groups}
+    other = []
+    for it in items:
+        by_group.get(it.get("group") or "", other).append(it)
+    lanes = [(g.get("content", ""), by_group[g.get("id")]) for g in groups]
+    if other:
+        lanes.append(("Other" if lanes else "", other))
+    return lanes
+
+def _stack(lane_items):
+    """([(item, start, end, row)], n_rows) — first row with no overlap, in the timeline's order."""
+    spans = []
+    for it in lane_items:
+        s = _day(it.get("start"))
+        if s is not None:
+            spans.append((COLOR_RANK.get(it.get("color", ""), 99), s, max(_day(it.get("end")) or s, s + 1), it))
+    spans.sort(key=lambda t: (t[0], t[1]))
+    rows = []   # per row: sorted starts, matching ends, latest end
+    placed = []
+    for _, s, e, it in spans:
+        for r, row in enumerate(rows):
+            starts, ends = row[0], row[1]
+            if s >= row[2]:                      # common case: past everything in the row
+                starts.append(s); ends.append(e); row[2] = e
+                break
+            k = bisect.bisect_left(starts, s)
+            if (k == 0 or ends[k - 1] <= s) and (k == len(starts) or starts[k] >= e):
+                starts.insert(k, s); ends.insert(k, e); row[2] = max(row[2], e)
+                break
+        else:
+            r = len(rows)
+            rows.append([[s], [e], e])
+        placed.append((it, s, e, r))
+    return placed, len(rows)
+
+def _fit(text: str, size: float, width: float) -> str:
+    """Truncate with an ellipsis to an approximate Helvetica width (0.55 em per character)."""
+    max_chars = int(width / (0.55 * size))
+    if max_chars <= 1:
+        return ""
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+def _ticks(t0: float, t1: float):
+    """Month (or quarter/year) boundaries inside [t0, t1] with their labels."""
+    span = t1 - t0
+    step = 1 if span <= 800 else 3 if span <= 2500 else 12
+    d = date.fromordinal(int(t0))
+    d = date(d.year, d.month, 1)
+    out = []
+    while d.toordinal() <= t1:
+        if d.toordinal() >= t0 and (d.month - 1) % step == 0:
+            out.append((d.toordinal(), d.strftime("%Y") if step == 12 else d.strftime("%b %Y")))
+        d = date(d.year + (d.month // 12), d.month % 12 + 1, 1)
+    return out
+
+def render_poster(canvas, items, groups, width: float, height: float, title: str = "") -> None:
+    """Lay the roadmap out on a width × height (points) page and draw it lane by lane."""
+    items = expand_items(items)   # recurring rules → occurrences (whole series)
+    window = initial_window(items)
+    if window:
+        t0, t1 = _day(window[0]), _day(window[1])
+    else:
+        t0 = date.today().toordinal() - 30; t1 = t0 + 60
+    margin = min(width, height) * 0.02
+    label_w = width * LABEL_W_FRAC
+    x0, x1 = margin + label_w, width - margin
+    axis_top = margin + (height * 0.03 if title else 0)
+    y0 = axis_top + height * AXIS_H_FRAC
+    xs = lambda t: x0 + (min(max(t, t0), t1) - t0) / (t1 - t0) * (x1 - x0)
+
+    lanes = _lanes(items, groups)
+    # rows per lane are needed up front to size the rows so every lane fits the page
+    stacked = [(label, *_stack(lane)) for label, lane in lanes]
+    total_rows = sum(max(1, n) for _, _, n in stacked) or 1
+    row_h = min(MAX_ROW_PT, (height - margin - y0) / total_rows)
+    pad = row_h * 0.12
+    font = max(row_h * 0.30, 0.5)
+
+    canvas.begin(width, height)
+    if title:
+        canvas.text(margin, margin + height * 0.02, title, size=height * 0.018, bold=True)
+    axis_font = max(min(height * 0.012, (x1 - x0) / 80), 4)
+    for t, label in _ticks(t0, t1):
+        x = xs(t)
+        canvas.line(x, axis_top, x, height - margin, GRID, width=0.6)
+        canvas.text(x + 2, y0 - axis_font * 0.6, label, size=axis_font, color="#64748B")
+    today = date.today().toordinal()
+    if t0 <= today <= t1:
+        canvas.line(xs(today), axis_top, xs(today), height - margin, "#F43F5E", width=1)
+
+    # draw lane by lane; elements go straight to the output
+    y = y0
+    for label, placed, n_rows in stacked:
+        lane_h = max(1, n_rows) * row_h
+        canvas.line(margin, y, x1, y, GRID, width=0.8)
+        canvas.text(margin, y + min(lane_h, row_h) / 2 + font * 0.35, _fit(label, font * 1.1, label_w - 6),
+                    size=font * 1.1, bold=True)
+        for it, s, e, r in placed:
+            bx0, bx1 = xs(s), xs(e)
+            if bx1 - bx0 < 1:
+                bx1 = bx0 + 1
+            by = y + r * row_h + pad
+            bh = row_h - 2 * pad
+            canvas.bar(bx0, by, bx1 - bx0, bh, it.get("color") or "#3B82F6",
+                       open_start=bool(it.get("openStart")), open_end=bool(it.get("openEnd")))
+            inner = bx1 - bx0 - 2 * pad
+            sub = (it.get("subtitle") or "").strip()
+            ty = by + bh / 2 + (font * 0.35 if not sub else -font * 0.15)
+            canvas.text(bx0 + pad, ty, _fit(str(it.get("content", "")), font, inner), size=font, bold=True)
+            if sub:
+                canvas.text(bx0 + pad, ty + font * 0.95, _fit(sub, font * 0.8, inner), size=font * 0.8)
+        y += lane_h
+    canvas.line(margin, y, x1, y, GRID, width=0.8)
+    canvas.end()
+
+# ---------- SVG ----------
+class SvgCanvas:
+    def __init__(self, out):
+        self.out = out   # binary file object
+
+    def _w(self, s: str) -> None:
+        self.out.write(s.encode("utf-8"))
+
+    def begin(self, width, height):
+        self._w(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{width / MM:.1f}mm" height="{height / MM:.1f}mm" '
+                f'viewBox="0 0 {width:.2f} {height:.2f}" font-family="Montserrat, Helvetica, Arial, sans-serif">\n'
+                f'<rect width="100%" height="100%" fill="#ffffff"/>\n')
+
+    def line(self, xa, ya, xb, yb, color, width=1.0, dash=None):
+        d = f' stroke-dasharray="{dash[0]:.2f} {dash[1]:.2f}"' if dash else ""
+        self._w(f'<line x1="{xa:.2f}" y1="{ya:.2f}" x2="{xb:.2f}" y2="{yb:.2f}" stroke="{color}" stroke-width="{width:.2f}"{d}/>\n')
+
+    def bar(self, x, y, w, h, color, open_start=False, open_end=False):
+        bw = 2 * 0.75   # 2px border in points
+        dash = (3 * bw, 2 * bw)
+        sides = [
+            (x, y, x + w, y, None), (x, y + h, x + w, y + h, None),
+            (x, y, x, y + h, dash if open_start else None), (x + w, y, x + w, y + h, dash if open_end else None),
+        ]
+        self._w(f'<g><rect x="{x:.2f}" y="{y:.2f}" width="{w:.2f}" height="{h:.2f}" fill="{color}" fill-opacity="{FILL_ALPHA}"/>')
+        for xa, ya, xb, yb, d in sides:
+            da = f' stroke-dasharray="{d[0]:.2f} {d[1]:.2f}"' if d else ""
+            self._w(f'<line x1="{xa:.2f}" y1="{ya:.2f}" x2="{xb:.2f}" y2="{yb:.2f}" stroke="{color}" stroke-width="{bw:.2f}"{da}/>')
+        self._w("</g>\n")
+
+    def text(self, x, y, s, size=10.0, color=TEXT, bold=False):
+        if not s:
+            return
+        weight = ' font-weight="700"' if bold else ""
+        self._w(f'<text x="{x:.2f}" y="{y:.2f}" font-size="{size:.2f}" fill="{color}"{weight}>{escape(s)}</text>\n')
+
+    def end(self):
+        self._w("</svg>\n")
+
+# ---------- PDF ----------
+def _pdf_str(s: str) -> str:
+    b = s.replace("…", "...").encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + b.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+class PdfCanvas:
+    """Single-page PDF written straight to a binary file; the content stream is deflated on the fly."""
+    MAX_PT = 14400   # largest page side most readers accept; bigger pages scale via /UserUnit
+
+    def __init__(self, out):
+        self.out = out
+        self._offsets = {}
+        self._pos = 0
+        self._z = None
+        self._stream_len = 0
+
+    def _raw(self, b: bytes) -> None:
+        self.out.write(b)
+        self._pos += len(b)
+
+    def _obj(self, num: int, body: str) -> None:
+        self._offsets[num] = self._pos
+        self._raw(f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+
+    def _w(self, s: str) -> None:
+        chunk = self._z.compress(s.encode("latin-1"))
+        if chunk:
+            self._raw(chunk); self._stream_len += len(chunk)
+
+    def _y(self, y: float) -> float:
+        return (self.height - y) / self.unit
+
+    def begin(self, width, height):
+        self.width, self.height = width, height
+        self.unit = max(1, math.ceil(max(width, height) / self.MAX_PT))
+        w, h = width / self.unit, height / self.unit
+        user_unit = f" /UserUnit {self.unit}" if self.unit > 1 else ""
+        self._raw(b"%PDF-1.6\n%\xe2\xe3\xcf\xd3\n")
+        self._obj(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        self._obj(2, "<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+        self._obj(3, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w:.2f} {h:.2f}]{user_unit} "
+                     "/Resources << /Font << /F1 5 0 R /F2 6 0 R >> /ExtGState << /GS1 7 0 R >> >> "
+                     "/Contents 4 0 R >>")
+        self._obj(5, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._obj(6, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        self._obj(7, f"<< /Type /ExtGState /ca {FILL_ALPHA} >>")
+        self._offsets[4] = self._pos
+        self._raw(b"4 0 obj\n<< /Length 8 0 R /Filter /FlateDecode >>\nstream\n")
+        self._z = zlib.compressobj(6)
+        self._w(f"1 1 1 rg 0 0 {w:.2f} {h:.2f} re f\n")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _rgb(color: str) -> str:
+        return " ".join(f"{c:.3f}" for c in _hex_rgb(color))
+
+    def line(self, xa, ya, xb, yb, color, width=1.0, dash=None):
+        u = self.unit
+        d = f"[{dash[0] / u:.2f} {dash[1] / u:.2f}] 0 d " if dash else "[] 0 d "
+        self._w(f"{self._rgb(color)} RG {width / u:.2f} w {d}{xa / u:.2f} {self._y(ya):.2f} m {xb / u:.2f} {self._y(yb):.2f} l S\n")
+
+    def bar(self, x, y, w, h, color, open_start=False, open_end=False):
+        u = self.unit
+        self._w(f"q /GS1 gs {self._rgb(color)} rg {x / u:.2f} {self._y(y + h):.2f} {w / u:.2f} {h / u:.2f} re f Q\n")
+        bw = 2 * 0.75 / u
+        dash = f"[{3 * bw:.2f} {2 * bw:.2f}] 0 d"
+        xa, xb, ya, yb = x / u, (x + w) / u, self._y(y), self._y(y + h)
+        self._w(f"{self._rgb(color)} RG {bw:.2f} w [] 0 d {xa:.2f} {ya:.2f} m {xb:.2f} {ya:.2f} l "
+                f"{xa:.2f} {yb:.2f} m {xb:.2f} {yb:.2f} l S\n"
+                f"{dash if open_start else '[] 0 d'} {xa:.2f} {ya:.2f} m {xa:.2f} {yb:.2f} l S\n"
+                f"{dash if open_end else '[] 0 d'} {xb:.2f} {ya:.2f} m {xb:.2f} {yb:.2f} l S\n")
+
+    def text(self, x, y, s, size=10.0, color=TEXT, bold=False):
+        if not s:
+            return
+        u = self.unit
+        self._w(f"BT /{'F2' if bold else 'F1'} {size / u:.2f} Tf {self._rgb(color)} rg "
+                f"{x / u:.2f} {self._y(y):.2f} Td {_pdf_str(s)} Tj ET\n")
+
+    def end(self):
+        tail = self._z.flush()
+        self._raw(tail); self._stream_len += len(tail)
+        self._raw(b"\nendstream\nendobj\n")
+        self._obj(8, str(self._stream_len))
+        xref = self._pos
+        n = max(self._offsets) + 1
+        rows = ["xref", f"0 {n}", "0000000000 65535 f "] + [f"{self._offsets[i]:010d} 00000 n " for i in range(1, n)]
+        self._raw(("\n".join(rows) + f"\ntrailer\n<< /Size {n} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n").encode("latin-1"))
+
+def write_poster(out, items, groups, fmt: str = "pdf", size: str = "A1", portrait: bool = False, title: str = "") -> None:
+    """Write an SVG or PDF poster of items/groups to the binary file object `out`."""
+    width, height = parse_size(size, portrait)
+    canvas = {"svg": SvgCanvas, "pdf": PdfCanvas}[fmt](out)
+    render_poster(canvas, items, groups, width, height, title=title)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Write a vector (SVG/PDF) poster of a roadmap.")
+    ap.add_argument("src", help="roadmap JSON (e.g. the app's Export JSON)")
+    ap.add_argument("-o", "--out", default="roadmap.pdf", help="output path; .svg or .pdf picks the format")
+    ap.add_argument("--size", default="A1", help="A0–A4 or <width>x<height> in mm (default A1)")
+    ap.add_argument("--portrait", action="store_true", help="portrait paper (A sizes are landscape by default)")
+    ap.add_argument("--title", default="", help="heading printed above the timeline")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    fmt = "svg" if args.out.lower().endswith(".svg") else "pdf"
+    try:
+        parse_size(args.size, args.portrait)
+    except ValueError as e:
+        ap.error(str(e))
+    with open(args.src, "r", encoding="utf-8") as f:
+        items, groups, _ = smart_import_all(f.read())
+    with open(args.out, "wb") as out:
+        write_poster(out, items, groups, fmt=fmt, size=args.size, portrait=args.portrait, title=args.title)
+    LOG.info("wrote %s (%d items, %d groups)", args.out, len(items), len(groups))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
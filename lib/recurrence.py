@@ -0,0 +1,179 @@
+# lib/recurrence.py — recurring items (sprints, release trains, on-call rotations) kept as one rule
+# • A rule is an ordinary entry of ss["items"] with a "repeat" dict:
+#     {"every": 2, "unit": "week", "count": 12}   or   {"every": 1, "unit": "month", "until": "2026-12-31"}
+#   The rule's start/end are the first occurrence (its length is reused for every occurrence);
+#   content/subtitle are templates: {n} = occurrence number (1-based), {start}, {end}
+# • occurrences(rule, window) is a generator: it jumps straight to the first occurrence that can
+#   touch the window and stops past the window end, so cost follows what is shown, not the series;
+#   occurrences whose override moves them into the window are found from the sparse overrides
+# • "overrides": {"<n>": {"content": …, "start": …, …} | {"skip": true}} — sparse per-occurrence edits,
+#   looked up only for the occurrences being generated
+# • expand_items(items, window) → concrete items (rules replaced by their occurrences)
+
+from datetime import date, datetime, timedelta
+
+UNITS = ("day", "week", "month")
+HORIZON_DAYS = 365           # unbounded series (no count/until) without a window: expand this far
+OVERRIDE_FIELDS = ("content", "subtitle", "start", "end", "color", "group")
+
+def _d(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    if isinstance(v, str) and v:
+        try:
+            return date.fromisoformat(v[:10])
+        except ValueError:
+            return None
+    return None
+
+def normalize_repeat(raw):
+    """Clean "repeat" dict, or None when raw is not a usable rule."""
+    if not isinstance(raw, dict) or raw.get("unit") not in UNITS:
+        return None
+    out = {"unit": raw["unit"]}
+    try:
+        out["every"] = max(1, int(raw.get("every", 1) or 1))
+    except (TypeError, ValueError):
+        out["every"] = 1
+    count = raw.get("count")
+    if isinstance(count, int) and not isinstance(count, bool) and count > 0:
+        out["count"] = count
+    until = _d(raw.get("until"))
+    if until is not None:
+        out["until"] = until.isoformat()
+    return out
+
+def is_rule(it) -> bool:
+    return isinstance(it.get("repeat"), dict)
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    y += d.year
+    m += 1
+    for day in (d.day, 30, 29, 28):
+        try:
+            return date(y, m, day)
+        except ValueError:
+            continue
+
+def _start_of(start0: date, rep: dict, k: int) -> date:
+    """Start of occurrence k (0-based) before overrides."""
+    if rep["unit"] == "month":
+        return _add_months(start0, k * rep["every"])
+    return start0 + timedelta(days=k * rep["every"] * (7 if rep["unit"] == "week" else 1))
+
+def _first_k(start0: date, length: timedelta, rep: dict, ws: date) -> int:
+    """Lowest k whose occurrence can still end after ws (never past the true first one)."""
+    first_start = ws - length
+    if first_start <= start0:
+        return 0
+    if rep["unit"] == "month":
+        months = (first_start.year - start0.year) * 12 + first_start.month - start0.month
+        return max(0, months // rep["every"] - 1)
+    step = rep["every"] * (7 if rep["unit"] == "week" else 1)
+    return max(0, (first_start - start0).days // step - 1)
+
+def series_end(rule: dict):
+    """Last date any occurrence can reach before overrides (None = repeats forever)."""
+    rep = rule["repeat"]
+    start0 = _d(rule.get("start"))
+    if start0 is None:
+        return None
+    length = max((_d(rule.get("end")) or start0) - start0, timedelta(0))
+    ends = []
+    if rep.get("count"):
+        ends.append(_start_of(start0, rep, rep["count"] - 1) + length)
+    if rep.get("until"):
+        ends.append(_d(rep["until"]) + length)
+    return min(ends) if ends else None
+
+def _fill(template: str, n: int, start: date, end: date) -> str:
+    return (template or "").replace("{n}", str(n)).replace("{start}", start.isoformat()).replace("{end}", end.isoformat())
+
+def occurrences(rule: dict, window=None):
+    """Yield concrete items of `rule` that overlap window = (start, end) dates (None = whole series).
+
+    Occurrence ids are "<rule id>#<n>"; each carries "series" (rule id) and "occurrence" (n).
+    Overridden dates count: an occurrence moved into the window is shown, one moved out is not.
+    """
+    rep = rule["repeat"]
+    start0 = _d(rule.get("start"))
+    if start0 is None:
+        return
+    end0 = _d(rule.get("end")) or start0
+    length = max(end0 - start0, timedelta(0))
+    ws, we = (_d(window[0]), _d(window[1])) if window else (None, None)
+    count, until = rep.get("count"), _d(rep.get("until"))
+    if count is None and until is None and we is None:
+        until = max(date.today(), start0) + timedelta(days=HORIZON_DAYS)
+    overrides = rule.get("overrides") or {}
+    base = {k: v for k, v in rule.items() if k not in ("repeat", "overrides", "_v")}
+
+    def build(n, s):
+        ov = overrides.get(str(n))
+        if ov and ov.get("skip"):
+            return None
+        occ = dict(base)
+        occ.update({"id": f"{rule['id']}#{n}", "series": rule["id"], "occurrence": n, "start": s, "end": s + length})
+        if ov:
+            for f in OVERRIDE_FIELDS:
+                if f in ov:
+                    occ[f] = _d(ov[f]) if f in ("start", "end") else ov[f]
+        if (ws is not None and _d(occ["end"]) < ws) or (we is not None and _d(occ["start"]) > we):
+            return None
+        for f in ("content", "subtitle"):
+            if not ov or f not in ov:
+                occ[f] = _fill(occ.get(f, ""), n, occ["start"], occ["end"])
+        return occ
+
+    k = k0 = _first_k(start0, length, rep, ws) if ws else 0
+    while True:
+        if count is not None and k >= count:
+            break
+        s = _start_of(start0, rep, k)
+        if (until is not None and s > until) or (we is not None and s > we):
+            break
+        k += 1
+        occ = build(k, s)
+        if occ is not None:
+            yield occ
+
+    # overrides that moved an occurrence from outside the slots walked above (sparse: only those)
+    for key, ov in overrides.items():
+        n = int(key) if str(key).isdigit() else 0
+        if k0 < n <= k or n < 1 or not ("start" in ov or "end" in ov):
+            continue
+        if count is not None and n > count:
+            continue
+        s = _start_of(start0, rep, n - 1)
+        if until is not None and s > until:
+            continue
+        occ = build(n, s)
+        if occ is not None:
+            yield occ
+
+def expand_items(items, window=None):
+    """Concrete items: plain items as they are, rules replaced by their occurrences in `window`."""
+    if not any(is_rule(it) for it in items):
+        return items
+    out = []
+    for it in items:
+        if is_rule(it):
+            out.extend(occurrences(it, window))
+        else:
+            out.append(it)
+    return out
+
+def set_override(rule: dict, n: int, fields: dict | None) -> None:
+    """Store (or with fields=None, clear) the override for occurrence n; JSON-ready values."""
+    overrides = dict(rule.get("overrides") or {})
+    if fields is None:
+        overrides.pop(str(n), None)
+    else:
+        overrides[str(n)] = {k: (v.isoformat() if isinstance(v, date) else v) for k, v in fields.items()}
+    if overrides:
+        rule["overrides"] = overrides
+    else:
+        rule.pop("overrides", None)
@@ -0,0 +1,303 @@
+# lib/roadmap.py — Streamlit-free roadmap helpers shared by the app and the CLIs
+# • Palette + color ordering
+# • Date parsing, pastel styles, render enrichment
+# • Auto height + initial window (same rules the timeline uses in the browser)
+# • Smart JSON importer
+
+import json
+import uuid
+from datetime import date, datetime, timedelta
+
+from lib.state import normalize_item, normalize_group, normalize_link
+from lib.recurrence import expand_items
+
+# ---------- Palette ----------
+PALETTE_MAP = {
+    "Blue":   "#3B82F6",
+    "Green":  "#10B981",
+    "Amber":  "#F59E0B",
+    "Rose":   "#F43F5E",
+    "Purple": "#8B5CF6",
+    "Slate":  "#64748B",
+}
+PALETTE_OPTIONS = list(PALETTE_MAP.keys())
+
+# Color order so Green sits near Blue
+COLOR_RANK = {
+    "#3B82F6": 10,  # Blue
+    "#10B981": 11,  # Green
+    "#F59E0B": 12,  # Amber
+    "#8B5CF6": 13,  # Purple
+    "#F43F5E": 14,  # Rose
+    "#64748B": 15,  # Slate
+}
+
+# Sentinels for open ranges
+OPEN_START_SENTINEL = date(1970, 1, 1)
+OPEN_END_SENTINEL   = date(2100, 1, 1)
+
+# ---------- Dates ----------
+def date_from_any(v):
+    if v is None or v == "":
+        return None
+    if isinstance(v, date) and not isinstance(v, datetime):
+        return v
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, str):
+        s = v.strip()
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        try:
+            return datetime.fromisoformat(s).date()
+        except Exception:
+            pass
+        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(s, fmt).date()
+            except Exception:
+                continue
+    return None
+
+def as_datetime(d):
+    if isinstance(d, datetime): return d
+    if isinstance(d, date):     return datetime(d.year, d.month, d.day)
+    if isinstance(d, str):
+        s = d.strip()
+        try:
+            if s.endswith("Z"): s = s[:-1] + "+00:00"
+            return datetime.fromisoformat(s)
+        except Exception:
+            return None
+    return None
+
+# ---------- Styles ----------
+def hex_to_rgba(hex_color: str, alpha: float = 0.22) -> str:
+    if not isinstance(hex_color, str):
+        return f"rgba(59,130,246,{alpha})"
+    h = hex_color.lstrip("#")
+    if len(h) == 3:
+        h = "".join([c*2 for c in h])
+    try:
+        r = int(h[0:2], 16); g = int(h[2:4], 16); b = int(h[4:6], 16)
+        return f"rgba({r},{g},{b},{alpha})"
+    except Exception:
+        return f"rgba(59,130,246,{alpha})"
+
+def soft_style_from_color(hex_color: str, open_start: bool = False, open_end: bool = False) -> str:
+    """Pastel fill + black text; dashed only on the open side(s)."""
+    rgba = hex_to_rgba(hex_color, 0.22)
+    # base: solid on all sides
+    css = [
+        f"background:{rgba}",
+        "color:#111",
+        f"border-color:{hex_color}",
+        "border-width:2px",
+        "border-style:solid",
+    ]
+    if open_start:
+        css += ["border-left-style:dashed"]
+    if open_end:
+        css += ["border-right-style:dashed"]
+    return "; ".join(css)
+
+def open_class_name(open_start: bool, open_end: bool) -> str:
+    return " ".join([c for c in ["open-start" if open_start else "", "open-end" if open_end else ""] if c])
+
+def enrich_items(items, window=None):
+    """Copy items and add the render-only fields (orderKey, style, className).
+
+    Recurring rules are expanded into their occurrences overlapping `window` (None = whole series).
+    """
+    enriched = []
+    for i in expand_items(items, window):
+        j = dict(i)
+        j["orderKey"] = COLOR_RANK.get(j.get("color", ""), 99)
+        j["style"] = soft_style_from_color(
+            j.get("color", "#3B82F6"),
+            open_start=bool(j.get("openStart")),
+            open_end=bool(j.get("openEnd")),
+        )
+        j["className"] = open_class_name(bool(j.get("openStart")), bool(j.get("openEnd")))
+        enriched.append(j)
+    return enriched
+
+# ---------- Height & window ----------
+def _max_overlap(intervals):
+    events = []
+    for s, e in intervals:
+        if s is None: continue
+        if e is None: e = s
+        events.append((s, +1)); events.append((e, -1))
+    events.sort()
+    cur = 0; mx = 0
+    for _, d in events:
+        cur += d; mx = max(mx, cur)
+    return max(1, mx) if events else 1
+
+def compute_auto_height(items, groups, stack=True, window=None):
+    items = expand_items(items, window)
+    group_ids = [g.get("id") for g in groups] or ["_ungrouped"]
+    per_lane, top_pad = 80, 120
+    total = 0
+    for gid in group_ids:
+        ivs = []
+        for it in items:
+            g = it.get("group") or "_ungrouped"
+            if g == gid:
+                s = as_datetime(it.get("start"))
+                e = as_datetime(it.get("end") or it.get("start"))
+                ivs.append((s, e))
+        total += _max_overlap(ivs) if stack else 1
+    return max(260, top_pad + per_lane * total)
+
+def initial_window(items):
+    """Server-side copy of the timeline's initial window (data span ± 5%, min 3 days).
+
+    Items outside 1990–2090 (open-range sentinels) are ignored unless nothing else is left.
+    Returns (start, end) as ISO datetimes, or None when there is nothing to show.
+    """
+    spans = []
+    for it in items:
+        s = as_datetime(it.get("start"))
+        e = as_datetime(it.get("end") or it.get("start")) or s
+        if s is None:
+            continue
+        spans.append((s, e))
+    if not spans:
+        return None
+    inside = [(s, e) for s, e in spans if 1990 <= s.year <= 2090 and 1990 <= e.year <= 2090]
+    base = inside or spans
+    mins = min(s for s, _ in base)
+    maxs = max(e for _, e in base)
+    pad = max(timedelta(days=3), (maxs - mins) * 0.05)
+    return (mins - pad).isoformat(), (maxs + pad).isoformat()
+
+# ---------- Smart JSON importer ----------
+def smart_import(text: str):
+    items, groups, _ = smart_import_all(text)
+    return items, groups
+
+def _get_case_insensitive(d: dict, key: str):
+    for k in d.keys():
+        if k.lower() == key.lower():
+            return d[k]
+    return None
+
+def locate_rows(doc):
+    """Find the (items, groups, links) arrays in any of the JSON shapes we accept.
+
+    Handles {"items": …}, {"data": {"items": …}}, one level of nesting, the first list that
+    looks like items, and a bare top-level list of items. Missing parts are None.
+    """
+    if isinstance(doc, list):
+        return doc, None, None
+    if not isinstance(doc, dict):
+        return None, None, None
+
+    root = doc
+    if "data" in {k.lower() for k in root.keys()}:
+        cand = _get_case_insensitive(root, "data")
+        if isinstance(cand, dict):
+            root = cand
+
+    items_in  = _get_case_insensitive(root, "items")
+    groups_in = _get_case_insensitive(root, "groups")
+    links_in  = _get_case_insensitive(root, "links")
+    if links_in is None:
+        links_in = _get_case_insensitive(root, "dependencies")
+
+    if items_in is None:
+        for v in root.values():
+            if isinstance(v, dict):
+                items_in  = items_in  or _get_case_insensitive(v, "items")
+                groups_in = groups_in or _get_case_insensitive(v, "groups")
+
+    if items_in is None:
+        for v in root.values():
+            if isinstance(v, list) and v and isinstance(v[0], dict):
+                sample = v[0]
+                if any(k in sample for k in ("content", "title", "name", "start", "startDate")):
+                    items_in = v
+                    break
+
+    return items_in, groups_in, links_in
+
+def smart_import_all(text: str):
+    """Like smart_import, plus dependency links ("links" or "dependencies") between known items."""
+    return smart_import_doc(json.loads(text))
+
+def smart_import_doc(doc):
+    """smart_import_all for an already-parsed JSON document."""
+    items_in, groups_in, links_in = locate_rows(doc)
+
+    if not isinstance(items_in, list):
+        return [], [], []
+
+    groups_norm, items_norm, name_to_id = [], [], {}
+
+    if isinstance(groups_in, list):
+        for idx, g in enumerate(groups_in):
+            gid = str(g.get("id") or uuid.uuid4())
+            name = g.get("content") or g.get("name") or g.get("title") or f"Group {idx+1}"
+            grp = normalize_group({"id": gid, "content": name, "order": idx})
+            groups_norm.append(grp)
+            name_to_id[(name or "").strip().lower()] = gid
+
+    def _ensure_group_from_item_name(name: str) -> str:
+        nm = (name or "").strip()
+        if not nm: return ""
+        lid = nm.lower()
+        if lid in name_to_id: return name_to_id[lid]
+        gid = str(uuid.uuid4())
+        groups_norm.append(normalize_group({"id": gid, "content": nm, "order": len(groups_norm)}))
+        name_to_id[lid] = gid
+        return gid
+
+    for it in items_in:
+        if not isinstance(it, dict): continue
+        iid = str(it.get("id") or uuid.uuid4())
+        title = it.get("content") or it.get("title") or it.get("name") or "(untitled)"
+        subtitle = it.get("subtitle") or it.get("description") or ""
+        group_id = it.get("group") or it.get("groupId")
+        if not group_id:
+            gname = it.get("category") or it.get("groupName") or it.get("group_name")
+            group_id = _ensure_group_from_item_name(gname) if gname else ""
+        start = date_from_any(it.get("start") or it.get("startDate"))
+        end   = date_from_any(it.get("end")   or it.get("endDate")) or start
+        if end and start and end < start:
+            start, end = end, start
+
+        color = it.get("color") or PALETTE_MAP["Blue"]
+        if not color.startswith("#"):
+            color = PALETTE_MAP["Blue"]
+
+        open_start = bool(it.get("openStart", False)) or (start and start <= OPEN_START_SENTINEL)
+        open_end   = bool(it.get("openEnd", False))   or (end   and end   >= OPEN_END_SENTINEL)
+        recurring = {k: it[k] for k in ("repeat", "overrides") if isinstance(it.get(k), dict)}
+
+        items_norm.append(normalize_item({
+            **recurring,
+            "id": iid,
+            "content": title,
+            "subtitle": subtitle,
+            "start": start or OPEN_START_SENTINEL if open_start else start,
+            "end":   end   or OPEN_END_SENTINEL   if open_end   else end,
+            "group": group_id,
+            "color": color,
+            "openStart": open_start,
+            "openEnd": open_end,
+            "className": open_class_name(open_start, open_end),
+            "style": soft_style_from_color(color, open_start=open_start, open_end=open_end),
+        }))
+
+    links_norm = []
+    if isinstance(links_in, list):
+        known = {it["id"] for it in items_norm}
+        for ln in links_in:
+            if not isinstance(ln, dict): continue
+            link = normalize_link(ln)
+            if link["from"] in known and link["to"] in known and link["from"] != link["to"]:
+                links_norm.append(link)
+
+    return items_norm, groups_norm, links_norm
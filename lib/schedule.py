@@ -0,0 +1,168 @@
+# lib/schedule.py — finish-to-start dependency links + incremental rescheduling
+# • A link {"from": A, "to": B, "lag": n} means B may not start before A ends + n days
+# • propagate() only walks the subgraph downstream of the changed items (O(V+E) of that subgraph),
+#   in topological order, pushing successors later while keeping their duration
+# • Cycles are rejected (would_create_cycle) or reported (ScheduleCycleError)
+# • critical_path() returns the chain of binding links that ends at the latest finish
+
+from collections import deque
+from datetime import timedelta
+
+from lib.roadmap import date_from_any
+
+class ScheduleCycleError(ValueError):
+    """Raised when dependency links form a cycle; .cycle holds the item ids involved."""
+    def __init__(self, cycle):
+        self.cycle = list(cycle)
+        super().__init__("dependency cycle between: " + ", ".join(self.cycle))
+
+def _index(links):
+    succ, pred = {}, {}
+    for ln in links:
+        succ.setdefault(ln["from"], []).append(ln)
+        pred.setdefault(ln["to"], []).append(ln)
+    return succ, pred
+
+def _lag(ln) -> timedelta:
+    return timedelta(days=int(ln.get("lag", 0) or 0))
+
+def _binding(pred_item, succ_item) -> bool:
+    """Open ends never constrain: an open-ended predecessor has no finish, an open-start successor no start."""
+    return not pred_item.get("openEnd") and not succ_item.get("openStart")
+
+def would_create_cycle(links, src: str, dst: str) -> bool:
+    """True when adding src → dst closes a loop (dst already reaches src)."""
+    if src == dst:
+        return True
+    succ, _ = _index(links)
+    seen, todo = {dst}, [dst]
+    while todo:
+        n = todo.pop()
+        for ln in succ.get(n, []):
+            m = ln["to"]
+            if m == src:
+                return True
+            if m not in seen:
+                seen.add(m); todo.append(m)
+    return False
+
+def _downstream(succ, roots):
+    seen, todo = set(roots), list(roots)
+    while todo:
+        n = todo.pop()
+        for ln in succ.get(n, []):
+            if ln["to"] not in seen:
+                seen.add(ln["to"]); todo.append(ln["to"])
+    return seen
+
+def _topo(nodes, succ):
+    """Kahn's algorithm restricted to `nodes`; raises ScheduleCycleError if they contain a cycle."""
+    indeg = {n: 0 for n in nodes}
+    for n in nodes:
+        for ln in succ.get(n, []):
+            if ln["to"] in indeg:
+                indeg[ln["to"]] += 1
+    queue = deque(n for n, d in indeg.items() if d == 0)
+    order = []
+    while queue:
+        n = queue.popleft(); order.append(n)
+        for ln in succ.get(n, []):
+            m = ln["to"]
+            if m in indeg:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    queue.append(m)
+    if len(order) != len(nodes):
+        raise ScheduleCycleError(sorted(n for n, d in indeg.items() if d > 0))
+    return order
+
+def propagate(items_by_id: dict, links, changed_ids) -> list:
+    """Push successors of `changed_ids` so every finish-to-start link holds again.
+
+    Items are updated in place (start/end moved together). The changed items themselves
+    are left where the user put them. Returns the ids of the items that moved.
+    """
+    succ, pred = _index(links)
+    roots = [i for i in changed_ids if i in items_by_id]
+    order = _topo(_downstream(succ, roots), succ)
+    dirty, moved = set(roots), []
+    for n in order:
+        if n in roots or n not in items_by_id:
+            continue
+        # only re-check items whose predecessors changed
+        preds = pred.get(n, [])
+        if not any(ln["from"] in dirty for ln in preds):
+            continue
+        it = items_by_id[n]
+        start = date_from_any(it.get("start"))
+        end = date_from_any(it.get("end")) or start
+        if start is None:
+            continue
+        required = None
+        for ln in preds:
+            p = items_by_id.get(ln["from"])
+            p_end = date_from_any(p.get("end")) if p else None
+            if p_end is None or not _binding(p, it):
+                continue
+            cand = p_end + _lag(ln)
+            required = cand if required is None or cand > required else required
+        if required is not None and required > start:
+            shift = required - start
+            it["start"], it["end"] = start + shift, end + shift
+            dirty.add(n); moved.append(n)
+    return moved
+
+def critical_path(items_by_id: dict, links) -> tuple:
+    """(item ids, link ids) of the binding chain that ends at the latest-finishing linked item.
+
+    A link is binding when its successor starts exactly at predecessor end + lag (zero slack).
+    """
+    _, pred = _index(links)
+    linked = {ln["from"] for ln in links} | {ln["to"] for ln in links}
+    ends = {}
+    for n in linked:
+        it = items_by_id.get(n)
+        e = date_from_any(it.get("end")) if it else None
+        if e is not None and not it.get("openEnd"):
+            ends[n] = e
+    if not ends:
+        return [], []
+    cur = max(ends, key=ends.get)
+    path, path_links, seen = [cur], [], {cur}
+    while True:
+        it = items_by_id[cur]
+        start = date_from_any(it.get("start"))
+        best, best_finish = None, None
+        for ln in pred.get(cur, []):
+            p = items_by_id.get(ln["from"])
+            p_end = date_from_any(p.get("end")) if p else None
+            if p_end is None or not _binding(p, it) or ln["from"] in seen:
+                continue
+            finish = p_end + _lag(ln)
+            if finish == start and (best_finish is None or finish > best_finish):
+                best, best_finish = ln, finish
+        if best is None:
+            break
+        cur = best["from"]
+        path.append(cur); path_links.append(best.get("id")); seen.add(cur)
+    path.reverse(); path_links.reverse()
+    return path, path_links
+
+def drop_links_for(links, item_id: str):
+    return [ln for ln in links if ln["from"] != item_id and ln["to"] != item_id]
+
+def annotate_critical(enriched, links):
+    """Flag the critical path on render copies.
+
+    Adds the "critical" class to items on the path and returns the links whose ends are both
+    in `enriched`, each with a "critical" flag for the timeline.
+    """
+    by_id = {str(it.get("id")): it for it in enriched}
+    visible = [ln for ln in links if ln["from"] in by_id and ln["to"] in by_id]
+    path, path_links = critical_path(by_id, visible)
+    if len(path) > 1:
+        for n in path:
+            it = by_id[n]
+            it["className"] = (it.get("className", "") + " critical").strip()
+    crit = set(path_links)
+    return [dict(ln, critical=ln.get("id") in crit) for ln in visible]
@@ -0,0 +1,244 @@
+# lib/session_memory.py — cap server memory by spilling idle sessions' roadmaps to disk
+# • One process-wide manager (st.cache_resource) sees every session's state
+# • Each run calls begin(): reloads this session's roadmap if it was spilled, records activity
+#   and an estimate of its size — roadmap plus the render/export caches built from it (DERIVED_KEYS),
+#   re-checked at every budget check since caches are built after begin() — then enforces the budget
+# • Over budget → least-recently-active sessions idle for ≥ IDLE_SECONDS are written to a
+#   compressed pickle snapshot and their items/groups/links emptied (render caches dropped);
+#   the marker key "_spill_path" in the session makes the next run reload it transparently
+# • A session that starts a run while being spilled stays resident (checked under the lock)
+# • Closed tabs are forgotten on the next run of any session, so the manager never keeps their state alive
+#
+# Config (env): ROADMAP_MEMORY_BUDGET_MB (default 512), ROADMAP_IDLE_SECONDS (default 600),
+#               ROADMAP_SPILL_DIR (default <tmp>/roadmap-spill-<uid>)
+# • Spills are pickles, so the directory must be private: it is created 0700 and used only when this
+#   user owns it and nobody else can write to it — otherwise a fresh mkdtemp() directory is used
+
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+import streamlit as st
+
+LOG = logging.getLogger("roadmap.session_memory")
+
+SPILL_KEYS = ("items", "groups", "links")
+DERIVED_KEYS = ("_view_cache", "_exports", "_poster")   # caches built from the roadmap: dropped on spill, rebuilt on demand
+SPILL_MARKER = "_spill_path"
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def estimate_bytes(items, sample: int = 32) -> int:
+    """Rough in-memory size of a roadmap: pickled size of a sample × count × dict overhead."""
+    n = len(items)
+    if not n:
+        return 0
+    step = max(1, n // sample)
+    picked = items[::step][:sample]
+    per_item = len(pickle.dumps(picked, protocol=pickle.HIGHEST_PROTOCOL)) / len(picked)
+    return int(per_item * n * 4)   # live dicts/strings/dates are ~4× their pickled size
+
+def _cache_bytes(v) -> int:
+    """Rough size of a derived cache: strings/bytes by length, lists of records by estimate_bytes."""
+    if isinstance(v, (str, bytes)):
+        return len(v)
+    if isinstance(v, list):
+        return estimate_bytes(v)
+    if isinstance(v, tuple):
+        return sum(_cache_bytes(x) for x in v)
+    if isinstance(v, dict):
+        return sum(_cache_bytes(x) for x in v.values())
+    return 0
+
+def _get(state, key):
+    return state[key] if key in state else None
+
+def _measure(rec) -> None:
+    """Re-estimate a resident session only when its roadmap or one of its caches was replaced."""
+    state = rec["state"]
+    items = _get(state, "items") or []
+    caches = [_get(state, k) for k in DERIVED_KEYS]
+    key = (id(items), len(items), *map(id, caches))
+    if rec["key"] != key:
+        rec["bytes"] = estimate_bytes(items) + sum(_cache_bytes(c) for c in caches if c)
+        rec["key"] = key
+
+def _uid() -> int:
+    return os.getuid() if hasattr(os, "getuid") else 0   # no uids/modes to check on Windows
+
+def _private_dir(path: str) -> str:
+    """path if it is a directory only this user can write to (created 0700 if missing), else a new private temp dir."""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+        if stat.S_ISDIR(info.st_mode) and info.st_uid == _uid() and not info.st_mode & 0o077:
+            return path
+        LOG.warning("spill dir %s is not private to this user; using a temporary one", path)
+    except OSError as e:
+        LOG.warning("spill dir %s unusable (%s); using a temporary one", path, e)
+    return tempfile.mkdtemp(prefix="roadmap-spill-")
+
+def _runtime_is_active(session_id: str) -> bool:
+    """True while Streamlit still has a connected browser tab for session_id."""
+    from streamlit import runtime
+    return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+
+class SessionMemoryManager:
+    def __init__(self, budget_bytes: int, idle_seconds: float, spill_dir: str, is_active=_runtime_is_active):
+        self.budget_bytes = int(budget_bytes)
+        self.is_active = is_active
+        self.idle_seconds = float(idle_seconds)
+        self.spill_dir = _private_dir(spill_dir)
+        self._lock = threading.Lock()
+        # session id → {"state": SafeSessionState | None, "last": monotonic, "bytes": int,
+        #               "key": (id(items), len(items), id(cache) per DERIVED_KEYS)}
+        self._sessions = {}
+        self._reload_ms = deque(maxlen=500)
+        self._evictions = 0
+        self._reloads = 0
+        self._spilled_bytes = 0
+        self._sweep(max_age_s=7 * 86400)
+
+    def _sweep(self, max_age_s: float) -> None:
+        """Remove snapshots of sessions that never came back (e.g. closed tabs, restarts)."""
+        cutoff = time.time() - max_age_s
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if name.endswith(".roadmap.pkl.z") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    # ---- per-run hook ----
+    def begin(self, session_id: str, state) -> None:
+        """Call at the top of every run with the session's (thread-safe) state."""
+        if SPILL_MARKER in state and state[SPILL_MARKER]:
+            self._reload(state)
+        now = time.monotonic()
+        with self._lock:
+            self._prune(exclude=session_id)
+            rec = self._sessions.setdefault(session_id, {"state": None, "last": now, "bytes": 0, "key": None})
+            rec["state"], rec["last"] = state, now
+            victims = self._pick_victims(now, exclude=session_id)
+        for sid, rec in victims:
+            self._spill(sid, rec)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _prune(self, exclude: str) -> None:
+        """Drop records of closed tabs (caller holds the lock) so their state can be freed."""
+        for sid in [sid for sid in self._sessions if sid != exclude and not self.is_active(sid)]:
+            del self._sessions[sid]
+
+    # ---- budget ----
+    def _pick_victims(self, now: float, exclude: str):
+        for r in self._sessions.values():
+            if r["state"] is not None:
+                _measure(r)
+        resident = sum(r["bytes"] for r in self._sessions.values() if r["state"] is not None)
+        if resident <= self.budget_bytes:
+            return []
+        idle = sorted(
+            ((sid, r) for sid, r in self._sessions.items()
+             if sid != exclude and r["state"] is not None and r["bytes"] and now - r["last"] >= self.idle_seconds),
+            key=lambda kv: kv[1]["last"],
+        )
+        victims = []
+        for sid, r in idle:
+            if resident <= self.budget_bytes:
+                break
+            resident -= r["bytes"]
+            victims.append((sid, dict(r)))
+            r["state"], r["bytes"], r["key"] = None, 0, None   # drop our reference right away
+        return victims
+
+    # ---- spill / reload ----
+    def _spill(self, session_id: str, rec) -> None:
+        state = rec["state"]
+        try:
+            payload = {k: state[k] for k in SPILL_KEYS if k in state}
+            blob = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            path = os.path.join(self.spill_dir, f"{session_id}-{uuid.uuid4().hex[:8]}.roadmap.pkl.z")
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except Exception as e:   # never lose data: leave the session resident
+            LOG.warning("spill failed for %s: %s", session_id, e)
+            return
+        with self._lock:
+            # the session may have started a run (or closed) since it was picked: then keep it resident
+            cur = self._sessions.get(session_id)
+            if cur is None or cur["last"] != rec["last"]:
+                os.remove(path)
+                return
+            state[SPILL_MARKER] = path
+            for k in payload:
+                state[k] = []
+            for k in DERIVED_KEYS:
+                if k in state:
+                    del state[k]
+            self._evictions += 1
+            self._spilled_bytes += len(blob)
+        LOG.info("spilled session %s (%d items, %d bytes on disk)", session_id, len(payload.get("items", [])), len(blob))
+
+    def _reload(self, state) -> None:
+        path = state[SPILL_MARKER]
+        t0 = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            LOG.error("reload of %s failed: %s", path, e)
+            state[SPILL_MARKER] = None
+            return
+        for k, v in payload.items():
+            state[k] = v
+        state[SPILL_MARKER] = None
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._reloads += 1
+            self._reload_ms.append(ms)
+
+    # ---- metrics ----
+    def metrics(self) -> dict:
+        with self._lock:
+            lat = sorted(self._reload_ms)
+            pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else None
+            return {
+                "sessions": len(self._sessions),
+                "resident_sessions": sum(1 for r in self._sessions.values() if r["state"] is not None),
+                "resident_bytes_est": sum(r["bytes"] for r in self._sessions.values() if r["state"] is not None),
+                "budget_bytes": self.budget_bytes,
+                "evictions": self._evictions,
+                "reloads": self._reloads,
+                "spilled_bytes_total": self._spilled_bytes,
+                "reload_ms_p50": pct(0.50),
+                "reload_ms_p95": pct(0.95),
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_memory_manager() -> SessionMemoryManager:
+    return SessionMemoryManager(
+        budget_bytes=_env_float("ROADMAP_MEMORY_BUDGET_MB", 512) * 1024 * 1024,
+        idle_seconds=_env_float("ROADMAP_IDLE_SECONDS", 600),
+        spill_dir=os.environ.get("ROADMAP_SPILL_DIR") or os.path.join(tempfile.gettempdir(), f"roadmap-spill-{_uid()}"),
+    )
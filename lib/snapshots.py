@@ -0,0 +1,324 @@
+# lib/snapshots.py — roadmap history as a base + JSON Patch (RFC 6902) deltas
+# • Versions are stored id-indexed: {"items": {id: item}, "groups": {id: group}, "links": {id: link}}
+#   so a delta only names the items that changed ("/items/<id>/start" …)
+# • commit() diffs against the in-memory head; with changed_ids it only looks at those items,
+#   so diff time and delta size follow the size of the change, not of the roadmap
+# • Every version after the first has a delta; a full base is added only once the deltas since the
+#   last base outgrow REBASE_RATIO of it, so storage per version follows the size of the change
+# • Item ops also carry "old" (previous value) and "title" (extra members, ignored by JSON Patch
+#   appliers), so changes_since() combines the stored deltas instead of rebuilding two versions
+# • Layout: <ROADMAP_SNAPSHOT_DIR>/<name>/index.json, base-<v>.json, delta-<v>.json; the directory is
+#   created by the first commit, and the default root is a per-user data dir outside the working tree
+# • Several server processes may share a history (e.g. a collab room): commit() holds a file lock on
+#   <name>/.lock and re-reads index.json first, and reads pick up versions other processes committed
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:   # Windows: commits are serialized within the process only
+    fcntl = None
+
+from lib.state import export_item, export_link
+
+SNAPSHOT_DIR = os.environ.get("ROADMAP_SNAPSHOT_DIR") or os.path.join(
+    os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"), "roadmap", "snapshots")
+REBASE_RATIO = 0.5
+FORMAT = 2   # index entries written with self-describing deltas ("old"/"title" on item ops)
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+SECTIONS = ("items", "groups", "links")
+
+# ---------- id-indexed documents ----------
+def index_doc(items, groups, links) -> dict:
+    """Session lists → id-indexed, JSON-ready document."""
+    return {
+        "items":  {str(it.get("id")): export_item(it) for it in items},
+        "groups": {str(g.get("id")): dict(g) for g in groups},
+        "links":  {str(ln.get("id")): export_link(ln) for ln in links},
+    }
+
+def unindex_doc(doc: dict) -> dict:
+    """id-indexed document → Export JSON shape (what smart_import reads)."""
+    return {k: list(doc.get(k, {}).values()) for k in SECTIONS}
+
+# ---------- JSON Patch ----------
+def _esc(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unesc(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def _diff_entry(ops, section: str, key: str, old, new) -> None:
+    base = f"/{section}/{_esc(key)}"
+    # items: remember what was there and the title, so deltas can be summarized on their own
+    extra = (lambda **kw: kw) if section == "items" else (lambda **kw: {})
+    title = (new or old or {}).get("content", "")
+    if old is None and new is not None:
+        ops.append({"op": "add", "path": base, "value": new})
+    elif new is None and old is not None:
+        ops.append({"op": "remove", "path": base, **extra(old=old)})
+    elif old != new:
+        for f in old.keys() - new.keys():
+            ops.append({"op": "remove", "path": f"{base}/{_esc(f)}", **extra(old=old[f], title=title)})
+        for f, v in new.items():
+            if f not in old:
+                ops.append({"op": "add", "path": f"{base}/{_esc(f)}", "value": v, **extra(title=title)})
+            elif old[f] != v:
+                ops.append({"op": "replace", "path": f"{base}/{_esc(f)}", "value": v, **extra(old=old[f], title=title)})
+
+def diff_docs(old: dict, new: dict, changed_ids=None) -> list:
+    """JSON Patch turning `old` into `new`.
+
+    changed_ids limits the items section to those ids (the caller vouches nothing else moved);
+    groups and links are small and always compared in full.
+    """
+    ops = []
+    for section in SECTIONS:
+        o, n = old.get(section, {}), new.get(section, {})
+        keys = (set(changed_ids) if section == "items" and changed_ids is not None
+                else o.keys() | n.keys())
+        for k in sorted(keys):
+            _diff_entry(ops, section, k, o.get(k), n.get(k))
+    return ops
+
+def apply_patch(doc: dict, ops) -> dict:
+    """Apply add/remove/replace ops in place (the subset diff_docs emits) and return doc."""
+    for op in ops:
+        parts = [_unesc(p) for p in op["path"].split("/")[1:]]
+        parent = doc
+        for p in parts[:-1]:
+            parent = parent[p]
+        if op["op"] == "remove":
+            del parent[parts[-1]]
+        elif op["op"] in ("add", "replace"):
+            parent[parts[-1]] = op["value"]
+        else:
+            raise ValueError(f"unsupported JSON Patch op: {op['op']}")
+    return doc
+
+def summarize_patch(ops, old: dict, new: dict) -> dict:
+    """Group a patch by item: {"added": [...], "removed": [...], "changed": [{id, title, fields}]}."""
+    added, removed, changed = [], [], {}
+    for op in ops:
+        parts = [_unesc(p) for p in op["path"].split("/")[1:]]
+        if parts[0] != "items":
+            continue
+        iid = parts[1]
+        if len(parts) == 2:
+            if op["op"] == "add":
+                added.append({"id": iid, "title": op["value"].get("content", "")})
+            else:
+                removed.append({"id": iid, "title": old["items"].get(iid, {}).get("content", "")})
+        else:
+            entry = changed.setdefault(iid, {"id": iid, "title": new["items"].get(iid, {}).get("content", ""), "fields": {}})
+            entry["fields"][parts[2]] = [old["items"].get(iid, {}).get(parts[2]), op.get("value")]
+    other = sum(1 for op in ops if not op["path"].startswith("/items/"))
+    return {"added": added, "removed": removed, "changed": list(changed.values()), "group_link_ops": other}
+
+def compose_summary(patches) -> dict:
+    """summarize_patch() for consecutive FORMAT 2 deltas, read from the ops alone (no documents)."""
+    recs, other = {}, 0
+    for ops in patches:
+        for op in ops:
+            parts = [_unesc(p) for p in op["path"].split("/")[1:]]
+            if parts[0] != "items":
+                other += 1
+                continue
+            iid = parts[1]
+            rec = recs.get(iid)
+            if rec is None:
+                existed = not (len(parts) == 2 and op["op"] == "add")
+                rec = recs[iid] = {"existed": existed, "alive": existed, "old": {}, "new": {}, "title": ""}
+            if len(parts) == 2:
+                if op["op"] == "add":
+                    rec["alive"] = True
+                    rec["new"] = dict(op["value"])
+                    rec["title"] = op["value"].get("content", "")
+                else:
+                    for f, v in (op.get("old") or {}).items():
+                        rec["old"].setdefault(f, v)
+                    rec["alive"] = False
+                    rec["new"] = {}
+                    rec["title"] = rec["title"] or (op.get("old") or {}).get("content", "")
+            else:
+                f = parts[2]
+                rec["old"].setdefault(f, op.get("old"))
+                rec["new"][f] = op.get("value")
+                rec["title"] = op.get("title", rec["title"])
+    added, removed, changed = [], [], []
+    for iid, rec in recs.items():
+        if rec["alive"] and not rec["existed"]:
+            added.append({"id": iid, "title": rec["title"]})
+        elif rec["existed"] and not rec["alive"]:
+            removed.append({"id": iid, "title": rec["old"].get("content", rec["title"])})
+        elif rec["alive"]:
+            fields = {f: [rec["old"].get(f), rec["new"].get(f)] for f in rec["new"].keys() | rec["old"].keys()
+                      if rec["new"].get(f) != rec["old"].get(f)}
+            if fields:
+                changed.append({"id": iid, "title": rec["new"].get("content", rec["title"]), "fields": fields})
+    return {"added": added, "removed": removed, "changed": changed, "group_link_ops": other}
+
+# ---------- store ----------
+class SnapshotStore:
+    def __init__(self, name: str, root: str | None = None, rebase_ratio: float = REBASE_RATIO):
+        if not _NAME_RE.match(name or "") or name.startswith("."):
+            raise ValueError(f"invalid snapshot history name: {name!r}")
+        self.dir = os.path.join(root or SNAPSHOT_DIR, name)
+        self.rebase_ratio = rebase_ratio
+        self._lock = threading.RLock()
+        self._index, self._stamp = [], None   # stamp: (mtime_ns, size) of the index.json we read
+        self._head = None          # id-indexed doc of the latest version (loaded lazily)
+        self._cache = (None, None) # (version, doc) of the last reconstruction
+        self._refresh()
+
+    # ---- files ----
+    def _read_json(self, fname, default=None):
+        path = os.path.join(self.dir, fname)
+        if not os.path.exists(path):
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, fname, obj) -> int:
+        data = json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = os.path.join(self.dir, fname + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.dir, fname))
+        return len(data.encode("utf-8"))
+
+    def _index_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.dir, "index.json"))
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self) -> None:
+        """Re-read index.json if another process committed since we last read or wrote it."""
+        with self._lock:
+            stamp = self._index_stamp()
+            if stamp != self._stamp:
+                self._index, self._stamp = self._read_json("index.json", default=[]), stamp
+                self._head = None   # versions are immutable, so the reconstruction cache stays valid
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ---- reads ----
+    def versions(self) -> list:
+        """[{"v", "ts", "kind", "label", "ops", "bytes"}] oldest first."""
+        self._refresh()
+        return list(self._index)
+
+    def latest(self):
+        self._refresh()
+        return self._index[-1]["v"] if self._index else None
+
+    def version_at(self, when: datetime):
+        """Newest version saved at or before `when` (None if there is none)."""
+        found = None
+        for e in self.versions():
+            if datetime.fromisoformat(e["ts"]) <= when:
+                found = e["v"]
+        return found
+
+    def load(self, v: int) -> dict:
+        """Reconstruct version v: nearest base at or below v + the deltas after it."""
+        with self._lock:
+            self._refresh()
+            if self._head is not None and self._index and v == self._index[-1]["v"]:
+                return json.loads(json.dumps(self._head))
+            return self._load(v)
+
+    def _load(self, v: int) -> dict:
+        cv, cdoc = self._cache
+        entries = [e for e in self._index if e["v"] <= v]
+        if not entries or entries[-1]["v"] != v:
+            raise KeyError(f"no snapshot version {v}")
+        base_pos = max(i for i, e in enumerate(entries) if e["kind"] == "base")
+        if cv is not None and entries[base_pos]["v"] <= cv <= v:
+            doc, start = json.loads(json.dumps(cdoc)), cv   # continue from the cached version
+        else:
+            doc, start = self._read_json(entries[base_pos]["file"]), entries[base_pos]["v"]
+        for e in entries:
+            if e["v"] > start and e["kind"] == "delta":
+                apply_patch(doc, self._read_json(e["file"]))
+        self._cache = (v, json.loads(json.dumps(doc)))
+        return doc
+
+    # ---- writes ----
+    def commit(self, items, groups, links, changed_ids=None, label: str = "") -> dict | None:
+        """Save the current roadmap as a new version; None when nothing changed.
+
+        changed_ids: ids of items touched since the previous commit, or None for a full diff.
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._head is None and self._index:
+                self._head = self.load(self.latest())
+            if changed_ids is not None and self._head is not None:
+                by_id = {str(it.get("id")): it for it in items if str(it.get("id")) in changed_ids}
+                new_items = {i: export_item(by_id[i]) for i in by_id}
+                new = {
+                    "items": new_items,
+                    "groups": {str(g.get("id")): dict(g) for g in groups},
+                    "links": {str(ln.get("id")): export_link(ln) for ln in links},
+                }
+                ops = diff_docs(self._head, new, changed_ids)
+            else:
+                new = index_doc(items, groups, links)
+                ops = diff_docs(self._head or {}, new)
+            if self._head is not None and not ops:
+                return None
+
+            v = (self.latest() or 0) + 1
+            base_at = max((i for i, e in enumerate(self._index) if e["kind"] == "base"), default=None)
+            chain = self._index[base_at + 1:] if base_at is not None else []
+            first = self._head is None
+            if first:
+                self._head = new
+            else:
+                apply_patch(self._head, ops)
+            entry = {"v": v, "ts": datetime.now().isoformat(timespec="seconds"), "label": label,
+                     "ops": len(ops), "fmt": FORMAT}
+            if not first:
+                entry["delta"] = f"delta-{v:06d}.json"
+                entry["delta_bytes"] = self._write_json(entry["delta"], ops)
+            chain_bytes = sum(e.get("delta_bytes", e["bytes"]) for e in chain) + entry.get("delta_bytes", 0)
+            if first or chain_bytes > self._index[base_at]["bytes"] * self.rebase_ratio:
+                entry.update(kind="base", file=f"base-{v:06d}.json")
+                entry["bytes"] = self._write_json(entry["file"], self._head)
+            else:
+                entry.update(kind="delta", file=entry["delta"], bytes=entry["delta_bytes"])
+            self._index.append(entry)
+            self._write_json("index.json", self._index)
+            self._stamp = self._index_stamp()
+            return entry
+
+    def changes_since(self, v: int) -> dict:
+        """Summary of what changed between version v and the latest version.
+
+        Combines the stored deltas after v, so the cost follows the size of the changes; histories
+        written before deltas carried old values fall back to diffing the two versions.
+        """
+        entries = [e for e in self.versions() if e["v"] > v]
+        if all(e.get("fmt") == FORMAT and e.get("delta") for e in entries):
+            return compose_summary(self._read_json(e["delta"]) for e in entries)
+        old, new = self.load(v), self.load(self.latest())
+        return summarize_patch(diff_docs(old, new), old, new)
@@ -1,6 +1,8 @@
 import json
 from datetime import date, datetime, timedelta
 
+from lib.recurrence import normalize_repeat
+
 def _coerce_date(d):
     if isinstance(d, date):
         return d
@@ -25,6 +27,11 @@ def normalize_item(raw):
     out["start"] = _coerce_date(out.get("start"))
     out["end"]   = _coerce_date(out.get("end"))
     out["type"] = "range"
+    if "repeat" in out:   # recurring rule (lib/recurrence.py); drop a malformed one
+        out["repeat"] = normalize_repeat(out["repeat"])
+        if out["repeat"] is None:
+            del out["repeat"]
+            out.pop("overrides", None)
     # Style/color
     color = out.get("color")
     if color:
@@ -38,30 +45,56 @@ def normalize_group(raw):
     out["order"] = out.get("order", 0)
     return out
 
+def normalize_link(raw):
+    """Finish-to-start dependency: `to` starts no earlier than `from` ends + `lag` days."""
+    out = dict(raw)
+    out["from"] = str(out.get("from") or out.get("source") or "")
+    out["to"] = str(out.get("to") or out.get("target") or "")
+    out["id"] = str(out.get("id") or f"{out['from']}->{out['to']}")
+    out["type"] = "FS"
+    try:
+        out["lag"] = int(out.get("lag", 0) or 0)
+    except (TypeError, ValueError):
+        out["lag"] = 0
+    return out
+
 def normalize_state(state):
     state["items"] = [normalize_item(x) for x in state.get("items",[])]
     state["groups"] = [normalize_group(x) for x in state.get("groups",[])]
+    state["links"] = [normalize_link(x) for x in state.get("links",[])]
 
 def reset_defaults(state):
     state["items"] = []
     state["groups"] = []
+    state["links"] = []
     state["active_group_id"] = ""
     state["editing_item_id"] = ""
 
+def export_item(it) -> dict:
+    """JSON-ready item in the Export JSON shape (recurring rules keep repeat/overrides)."""
+    out = {
+        "id": it.get("id"),
+        "content": it.get("content",""),
+        "subtitle": it.get("subtitle",""),
+        "start": it.get("start").isoformat() if isinstance(it.get("start"), date) else str(it.get("start")),
+        "end":   it.get("end").isoformat()   if isinstance(it.get("end"), date)   else str(it.get("end")),
+        "group": it.get("group",""),
+        "color": it.get("color","") or _extract_color_from_style(it.get("style","")),
+    }
+    if it.get("repeat"):
+        out["repeat"] = dict(it["repeat"])
+        if it.get("overrides"):
+            out["overrides"] = {n: dict(ov) for n, ov in it["overrides"].items()}
+    return out
+
+def export_link(ln) -> dict:
+    return {"id": ln.get("id"), "from": ln.get("from"), "to": ln.get("to"), "type": ln.get("type", "FS"), "lag": ln.get("lag", 0)}
+
 def export_items_groups(state) -> str:
     payload = {
-        "items": [
-            {
-                "id": it.get("id"),
-                "content": it.get("content",""),
-                "subtitle": it.get("subtitle",""),
-                "start": it.get("start").isoformat() if isinstance(it.get("start"), date) else str(it.get("start")),
-                "end":   it.get("end").isoformat()   if isinstance(it.get("end"), date)   else str(it.get("end")),
-                "group": it.get("group",""),
-                "color": it.get("color","") or _extract_color_from_style(it.get("style","")),
-            } for it in state.get("items",[])
-        ],
-        "groups": state.get("groups",[])
+        "items": [export_item(it) for it in state.get("items",[])],
+        "groups": state.get("groups",[]),
+        "links": [export_link(ln) for ln in state.get("links",[])],
     }
     return json.dumps(payload, indent=2)
 
@@ -0,0 +1,121 @@
+# lib/static_export.py — self-contained read-only HTML export
+# • Same template as the in-app timeline (build_timeline_html)
+# • Data, height and initial window precomputed here; JSON payload minified
+# • vis-timeline CSS/JS optionally inlined so viewers need no CDN and no server (no web font either)
+# • --watch polls the source file's mtime and rebuilds the page (atomically) whenever it changes
+#
+# CLI:
+#   python -m lib.static_export roadmap.json -o roadmap.html [--assets DIR | --no-inline] [--watch [--interval 2]]
+
+import argparse
+import logging
+import os
+import sys
+import time
+import urllib.request
+
+from lib.roadmap import enrich_items, compute_auto_height, initial_window, smart_import_all
+from lib.schedule import annotate_critical
+from lib.timeline import build_timeline_html, _VIS_CSS_URLS, _VIS_JS_URLS
+
+LOG = logging.getLogger("roadmap.static_export")
+
+def _fetch_first(urls, timeout: float = 15.0) -> str:
+    last = None
+    for u in urls:
+        try:
+            with urllib.request.urlopen(u, timeout=timeout) as resp:
+                return resp.read().decode("utf-8")
+        except Exception as e:  # try the next CDN
+            last = e
+            LOG.warning("asset fetch failed: %s (%s)", u, e)
+    raise RuntimeError(f"could not fetch any of {urls}: {last}")
+
+def fetch_vis_assets(assets_dir: str | None = None) -> dict:
+    """vis-timeline CSS + JS to embed in the page.
+
+    Read from assets_dir (self-hosted vis-timeline-graph2d.min.css/.js) when given,
+    otherwise downloaded from the same CDNs the app uses.
+    """
+    if assets_dir:
+        out = {}
+        for kind in ("css", "js"):
+            with open(os.path.join(assets_dir, f"vis-timeline-graph2d.min.{kind}"), "r", encoding="utf-8") as f:
+                out[kind] = f.read()
+        return out
+    return {"css": _fetch_first(_VIS_CSS_URLS), "js": _fetch_first(_VIS_JS_URLS)}
+
+def build_static_html(items, groups, inline_assets: dict | None = None, links=None) -> str:
+    """Render a read-only, self-contained timeline page for the given items/groups."""
+    enriched = enrich_items(items)
+    links_view = annotate_critical(enriched, links or [])
+    height_px = compute_auto_height(enriched, groups, stack=True)
+    html, _ = build_timeline_html(
+        enriched, groups,
+        stack=True,
+        height_px=height_px,
+        window=initial_window(enriched),
+        readonly=True,
+        inline_assets=inline_assets,
+        compact=True,
+        links=links_view,
+    )
+    return html
+
+def export_static_html(text: str, inline: bool = True, assets_dir: str | None = None) -> str:
+    """JSON roadmap text (any shape smart_import accepts) → static HTML page."""
+    items, groups, links = smart_import_all(text)
+    assets = fetch_vis_assets(assets_dir) if inline else None
+    return build_static_html(items, groups, inline_assets=assets, links=links)
+
+def _write(path: str, html: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp, path)   # viewers never load a half-written page
+    LOG.info("wrote %s (%d bytes)", path, len(html.encode("utf-8")))
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Write a self-contained read-only roadmap HTML page.")
+    ap.add_argument("src", help="roadmap JSON (e.g. the app's Export JSON)")
+    ap.add_argument("-o", "--out", default="roadmap.html", help="output HTML path (default: roadmap.html)")
+    ap.add_argument("--assets", default=None, help="directory with vis-timeline-graph2d.min.css/.js to embed (default: fetch from CDN)")
+    ap.add_argument("--no-inline", action="store_true", help="load vis-timeline from the CDN instead of embedding it")
+    ap.add_argument("--watch", action="store_true", help="keep running and rebuild whenever SRC changes")
+    ap.add_argument("--interval", type=float, default=2.0, help="--watch polling interval in seconds (default: 2)")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        assets = None if args.no_inline else fetch_vis_assets(args.assets)   # fetched once, also for --watch
+    except (RuntimeError, OSError) as e:
+        LOG.error("%s (retry with --no-inline to reference the CDN)", e)
+        return 1
+
+    def build() -> bool:
+        try:
+            with open(args.src, "r", encoding="utf-8") as f:
+                items, groups, links = smart_import_all(f.read())
+        except (OSError, ValueError) as e:   # e.g. caught mid-write: keep the last good page
+            LOG.error("cannot read %s: %s", args.src, e)
+            return False
+        _write(args.out, build_static_html(items, groups, inline_assets=assets, links=links))
+        return True
+
+    ok = build()
+    if not args.watch:
+        return 0 if ok else 1
+    LOG.info("watching %s (Ctrl+C to stop)", args.src)
+    stamp = os.stat(args.src).st_mtime_ns if os.path.exists(args.src) else None
+    try:
+        while True:
+            time.sleep(args.interval)
+            cur = os.stat(args.src).st_mtime_ns if os.path.exists(args.src) else None
+            if cur is not None and cur != stamp:
+                stamp = cur
+                build()
+    except KeyboardInterrupt:
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@
 # • Robust loader with readable error messages
 
 import json
+import re
 from datetime import date, datetime
 import streamlit.components.v1 as components
 
@@ -26,12 +27,27 @@ _DOM_TO_IMG_URLS = [
     "https://cdnjs.cloudflare.com/ajax/libs/dom-to-image-more/3.3.0/dom-to-image-more.min.js",
 ]
 
+_PLACEHOLDER_RE = re.compile(
+    r"__(HEIGHT|EXPORT|CSS_URLS|JS_URLS|DTI_URLS|WINDOW|OPTIONS|FONT_HEAD|INLINE_HEAD|ITEMS|GROUPS|LINKS)__")
+
 def _dt(d):
     if isinstance(d, (date, datetime)):
         return d.isoformat()
     return d
 
-def render_timeline(items, groups, selected_id: str = "", export=None, stack: bool = True, height_px: int | None = None):
+def build_timeline_html(items, groups, selected_id: str = "", export=None, stack: bool = True,
+                        height_px: int | None = None, window=None, readonly: bool = False,
+                        inline_assets: dict | None = None, compact: bool = False, links=None):
+    """Return (html, height) for the timeline page.
+
+    links: optional dependency links [{"from", "to", "critical"}] drawn as arrows over the items.
+    window: optional precomputed (start, end) ISO pair used instead of the in-browser span rule.
+    readonly: disable drag/drop editing (static viewers).
+    inline_assets: optional {"css": str, "js": str} with the vis-timeline sources to embed,
+                   so the page does not need the CDN (the Montserrat web font link is then left out too).
+    compact: emit minified JSON payloads (no whitespace).
+    """
+    seps = (",", ":") if compact else None
     items_json = json.dumps([
         {
             "id": i.get("id"),
@@ -46,12 +62,32 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
             "openEnd":   bool(i.get("openEnd", False)),
             "className": i.get("className", "")
         } for i in items
-    ])
-    groups_json = json.dumps([{"id": g.get("id"), "content": g.get("content")} for g in groups])
+    ], separators=seps)
+    groups_json = json.dumps([{"id": g.get("id"), "content": g.get("content")} for g in groups], separators=seps)
+    links_json = json.dumps([
+        {"from": ln.get("from"), "to": ln.get("to"), "critical": bool(ln.get("critical", False))}
+        for ln in (links or [])
+    ], separators=seps)
     export_json = json.dumps(export or {})
-    css_urls = json.dumps(_VIS_CSS_URLS)
+    window_json = json.dumps(list(window) if window else None)
+    options_json = json.dumps({"readonly": bool(readonly)})
+    css_urls = json.dumps([] if inline_assets else _VIS_CSS_URLS)
     js_urls  = json.dumps(_VIS_JS_URLS)
     dti_urls = json.dumps(_DOM_TO_IMG_URLS)
+    inline_head = ""
+    # self-contained pages (inline_assets) make no network requests: system font stack instead of Montserrat
+    font_head = "" if inline_assets else (
+        '<link rel="preconnect" href="https://fonts.googleapis.com">\n'
+        '  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+        '  <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap" rel="stylesheet">'
+    )
+    if inline_assets:
+        # a literal "</script" / "</style" would close the inline block early
+        inline_head = (
+            "<style>" + inline_assets.get("css", "").replace("</style", "<\\/style") + "</style>\n"
+            "  <script>" + inline_assets.get("js", "").replace("</script", "<\\/script") + "</script>\n"
+            "  <script>window._visReady = !!window.vis;</script>"
+        )
 
     rows = max(1, len(groups))
     default_height = max(260, 80 * rows + 120)
@@ -62,14 +98,15 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
 <html>
 <head>
   <meta charset="utf-8"/>
-  <link rel="preconnect" href="https://fonts.googleapis.com">
-  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-  <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap" rel="stylesheet">
+  __FONT_HEAD__
+  __INLINE_HEAD__
   <style>
     :root { --font: 'Montserrat', ui-sans-serif, -apple-system, Segoe UI, Roboto, Helvetica, Arial, "Noto Sans", "Helvetica Neue", sans-serif; }
     html, body { background: transparent; margin:0; padding:0; }
     body, #timeline, .vis-timeline, .vis-item, .vis-item-content, .vis-label, .vis-time-axis { font-family: var(--font); }
     #wrap { position: relative; }
+    #links { position:absolute; left:0; top:0; width:100%; height:100%; pointer-events:none; overflow:hidden; }
+    .vis-item.critical { box-shadow: 0 0 0 2px #dc2626; }
     #timeline { height: __HEIGHT__px; background: transparent; border-radius:12px; border:1px solid #e7e9f2; }
     .ttl { font-weight:700 }
     .sub { font-size:12px; opacity:.9; white-space:nowrap; overflow:hidden; text-overflow:ellipsis; max-width:260px }
@@ -106,6 +143,9 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
     const ITEMS    = __ITEMS__;
     const GROUPS   = __GROUPS__;
     const EXPORT   = __EXPORT__;
+    const WINDOW   = __WINDOW__;
+    const OPTIONS  = __OPTIONS__;
+    const LINKS    = __LINKS__;
 
     function showError(msg, err) {
       const el = document.getElementById('timeline');
@@ -142,6 +182,39 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
       return null;
     }
 
+    // ---------- Dependency arrows (SVG overlay, redrawn on every timeline change) ----------
+    function drawLinks(tl) {
+      if (!LINKS.length) return;
+      const NS = 'http://www.w3.org/2000/svg';
+      const wrap = document.getElementById('wrap');
+      let svg = document.getElementById('links');
+      if (!svg) {
+        svg = document.createElementNS(NS, 'svg'); svg.id = 'links';
+        svg.innerHTML = '<defs>' +
+          '<marker id="arr" viewBox="0 0 8 8" refX="7" refY="4" markerWidth="7" markerHeight="7" orient="auto"><path d="M0,0 L8,4 L0,8 z" fill="#64748b"/></marker>' +
+          '<marker id="arrc" viewBox="0 0 8 8" refX="7" refY="4" markerWidth="7" markerHeight="7" orient="auto"><path d="M0,0 L8,4 L0,8 z" fill="#dc2626"/></marker>' +
+          '</defs><g id="linkpaths"></g>';
+        wrap.appendChild(svg);
+      }
+      const box = wrap.getBoundingClientRect();
+      const known = (tl.itemSet && tl.itemSet.items) || {};   // vis internals: rendered items keep their DOM in .dom.box
+      let out = '';
+      for (const ln of LINKS) {
+        const a = known[ln.from], b = known[ln.to];
+        const ea = a && a.dom && a.dom.box, eb = b && b.dom && b.dom.box;
+        if (!ea || !eb || !ea.isConnected || !eb.isConnected) continue;
+        const ra = ea.getBoundingClientRect(), rb = eb.getBoundingClientRect();
+        const x1 = ra.right - box.left, y1 = ra.top + ra.height / 2 - box.top;
+        const x2 = rb.left - box.left,  y2 = rb.top + rb.height / 2 - box.top;
+        const bend = Math.max(16, Math.abs(x2 - x1) / 3);
+        const color = ln.critical ? '#dc2626' : '#64748b';
+        out += '<path d="M' + x1 + ',' + y1 + ' C' + (x1 + bend) + ',' + y1 + ' ' + (x2 - bend) + ',' + y2 + ' ' + x2 + ',' + y2 + '"' +
+               ' fill="none" stroke="' + color + '" stroke-width="' + (ln.critical ? 2 : 1.5) + '"' +
+               ' marker-end="url(#' + (ln.critical ? 'arrc' : 'arr') + ')"/>';
+      }
+      document.getElementById('linkpaths').innerHTML = out;
+    }
+
     function layout() {
       const el = document.getElementById('timeline');
       if (!el || !window.vis) return;
@@ -174,7 +247,7 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
 
       const options = {
         stack: true,
-        editable: { updateTime: true, updateGroup: true, add: false, remove: false },
+        editable: OPTIONS.readonly ? false : { updateTime: true, updateGroup: true, add: false, remove: false },
         multiselect: true,
         snap: null,
         autoResize: true,
@@ -197,9 +270,14 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
       try {
         const tl = new vis.Timeline(el, items, groups, options);
         window._tl = tl;
+        tl.on('changed', () => { try { drawLinks(tl); } catch (e) {} });
 
-        // Initial window: ignore extreme sentinels so we don't zoom out to centuries
-        if (items.length) {
+        // Initial window: precomputed on the server when given…
+        if (Array.isArray(WINDOW) && WINDOW.length === 2) {
+          tl.setWindow(new Date(WINDOW[0]), new Date(WINDOW[1]), { animation: false });
+        }
+        // …otherwise ignore extreme sentinels so we don't zoom out to centuries
+        else if (items.length) {
           const arr = items.get().filter(x => {
             const y1 = (x.start || new Date()).getFullYear();
             const y2 = (x.end   || x.start || new Date()).getFullYear();
@@ -318,12 +396,20 @@ def render_timeline(items, groups, selected_id: str = "", export=None, stack: bo
   </script>
 </body>
 </html>
-    """.replace("__HEIGHT__", str(H)) \
-       .replace("__ITEMS__", items_json) \
-       .replace("__GROUPS__", groups_json) \
-       .replace("__EXPORT__", export_json) \
-       .replace("__CSS_URLS__", css_urls) \
-       .replace("__JS_URLS__", js_urls) \
-       .replace("__DTI_URLS__", dti_urls)
+    """
+    # One pass over the template: substituted text (user titles included) is never scanned again,
+    # so an item called "see __GROUPS__" stays text.
+    # ("<\/" is a valid JSON escape and keeps titles like "</script>" from closing the tag)
+    values = {
+        "HEIGHT": str(H), "EXPORT": export_json, "CSS_URLS": css_urls, "JS_URLS": js_urls,
+        "DTI_URLS": dti_urls, "WINDOW": window_json, "OPTIONS": options_json, "FONT_HEAD": font_head, "INLINE_HEAD": inline_head,
+        "ITEMS": items_json.replace("</", "<\\/"),
+        "GROUPS": groups_json.replace("</", "<\\/"),
+        "LINKS": links_json.replace("</", "<\\/"),
+    }
+    html = _PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], html)
+    return html, H
 
+def render_timeline(items, groups, selected_id: str = "", export=None, stack: bool = True, height_px: int | None = None, links=None):
+    html, H = build_timeline_html(items, groups, selected_id=selected_id, export=export, stack=stack, height_px=height_px, links=links)
     components.html(html, height=H + 20, scrolling=False)
@@ -0,0 +1,207 @@
+# lib/validation.py — import validation compiled from a declared schema
+# • Schemas are plain dicts: field → aliases, type, required / required-unless
+# • compile_schema() generates one specialised row checker per schema (aliases/type tests unrolled)
+# • validate_doc() checks every row in a single pass and collects ALL problems with row numbers
+#   (nothing is coerced here — smart_import only runs when the report is clean)
+# • errors_to_csv() → downloadable report
+
+import csv
+import io
+import re
+from datetime import date
+
+from lib.roadmap import date_from_any, locate_rows
+from lib.recurrence import UNITS
+
+# Aliases are tried in order and the first non-empty value wins (same rule as smart_import).
+ITEM_SCHEMA = {
+    "id":        {"aliases": ("id",), "type": "id"},
+    "content":   {"aliases": ("content", "title", "name"), "type": "text", "required": True},
+    "subtitle":  {"aliases": ("subtitle", "description"), "type": "text"},
+    "start":     {"aliases": ("start", "startDate"), "type": "date", "required_unless": "openStart"},
+    "end":       {"aliases": ("end", "endDate"), "type": "date"},
+    "group":     {"aliases": ("group", "groupId"), "type": "id", "ref": "groups"},
+    "category":  {"aliases": ("category", "groupName", "group_name"), "type": "text"},
+    "color":     {"aliases": ("color",), "type": "hex"},
+    "openStart": {"aliases": ("openStart",), "type": "bool"},
+    "openEnd":   {"aliases": ("openEnd",), "type": "bool"},
+    "repeat":    {"aliases": ("repeat",), "type": "repeat"},
+    "overrides": {"aliases": ("overrides",), "type": "overrides"},
+}
+GROUP_SCHEMA = {
+    "id":      {"aliases": ("id",), "type": "id"},
+    "content": {"aliases": ("content", "name", "title"), "type": "text"},
+}
+LINK_SCHEMA = {
+    "from": {"aliases": ("from", "source"), "type": "id", "required": True, "ref": "items"},
+    "to":   {"aliases": ("to", "target"), "type": "id", "required": True, "ref": "items"},
+    "lag":  {"aliases": ("lag",), "type": "int"},
+}
+
+_HEX_RE = re.compile(r"#(?:[0-9a-fA-F]{3}){1,2}")
+_BAD = object()   # checker result for "wrong type/format"; the message comes from the field plan
+
+def _check_text(v):
+    return v if type(v) is str else _BAD
+
+def _check_id(v):
+    return str(v) if type(v) in (str, int) else _BAD
+
+def _check_bool(v):
+    return v if type(v) is bool else _BAD
+
+def _check_int(v):
+    return v if type(v) is int else _BAD
+
+def _check_hex(v):
+    return v if type(v) is str and _HEX_RE.fullmatch(v) else _BAD
+
+def _check_date(v):
+    if type(v) is not str:
+        return _BAD
+    try:
+        return date.fromisoformat(v)            # fast path: plain YYYY-MM-DD
+    except ValueError:
+        d = date_from_any(v)                    # datetimes, "Z" suffix, d/m/Y …
+        return d if d is not None else _BAD
+
+def _check_repeat(v):
+    if type(v) is not dict or v.get("unit") not in UNITS:
+        return _BAD
+    for k in ("every", "count"):
+        if k in v and not (type(v[k]) is int and v[k] > 0):
+            return _BAD
+    if "until" in v and _check_date(v["until"]) is _BAD:
+        return _BAD
+    return v
+
+def _check_overrides(v):
+    if type(v) is not dict or not all(type(k) is str and k.isdigit() and type(o) is dict for k, o in v.items()):
+        return _BAD
+    return v
+
+_CHECKERS = {
+    "text": (_check_text, "must be text"),
+    "id":   (_check_id,   "must be a string or integer id"),
+    "bool": (_check_bool, "must be true or false"),
+    "int":  (_check_int,  "must be a whole number"),
+    "hex":  (_check_hex,  "must be a hex color like #3B82F6"),
+    "date": (_check_date, "is not a date (expected YYYY-MM-DD)"),
+    "repeat":    (_check_repeat,    'must be a rule like {"unit": "week", "every": 2, "count": 10}'),
+    "overrides": (_check_overrides, 'must map occurrence numbers ("3") to objects'),
+}
+# Cheap type tests are inlined into the generated code instead of calling the checker.
+_INLINE = {
+    "text": "type(v) is str",
+    "bool": "type(v) is bool",
+    "int":  "type(v) is int",
+}
+
+def compile_schema(schema: dict):
+    """Generate a row checker specialised for `schema` (alias lookups and type tests unrolled).
+
+    The checker is called as check(row) and returns (values, problems): the parsed values
+    needed by the cross-field/reference checks, and a list of (field, raw value, message)
+    tuples for that row.
+    """
+    keep = {"id", "start", "end"} | {n for n, spec in schema.items() if spec.get("ref")}
+    env = {"_BAD": _BAD}
+    lines = ["def check_row(row):", "    values = {}; problems = []; get = row.get"]
+    for idx, (name, spec) in enumerate(schema.items()):
+        check, msg = _CHECKERS[spec["type"]]
+        env[f"_c{idx}"] = check
+        aliases = spec["aliases"]
+        lines.append(f"    v = get({aliases[0]!r})")
+        for a in aliases[1:]:
+            lines.append(f"    if v is None or v == '': v = get({a!r})")
+        lines.append("    if v is None or v == '':")
+        if spec.get("required"):
+            lines.append(f"        problems.append(({name!r}, '', 'is required'))")
+        elif spec.get("required_unless"):
+            lines.append(f"        if get({spec['required_unless']!r}) is not True: problems.append(({name!r}, '', 'is required'))")
+        else:
+            lines.append("        pass")
+        if spec["type"] in _INLINE:
+            lines.append(f"    elif not ({_INLINE[spec['type']]}): problems.append(({name!r}, v, {msg!r}))")
+            if name in keep:
+                lines.append(f"    else: values[{name!r}] = v")
+        else:
+            lines.append("    else:")
+            lines.append(f"        x = _c{idx}(v)")
+            lines.append(f"        if x is _BAD: problems.append(({name!r}, v, {msg!r}))")
+            if name in keep:
+                lines.append(f"        else: values[{name!r}] = x")
+    lines.append("    return values, problems")
+    exec("\n".join(lines), env)
+    return env["check_row"]
+
+_CHECK_ITEM  = compile_schema(ITEM_SCHEMA)
+_CHECK_GROUP = compile_schema(GROUP_SCHEMA)
+_CHECK_LINK  = compile_schema(LINK_SCHEMA)
+
+def _run(section, rows, check_row, errors, refs=(), ids=None):
+    """One pass over `rows`. refs: (field, known ids, label) checked inline — sections run in
+    dependency order (groups → items → links), so referenced ids are always complete."""
+    for n, row in enumerate(rows, 1):
+        if type(row) is not dict:
+            errors.append((section, n, "", "", "row is not an object"))
+            continue
+        values, problems = check_row(row)
+        for field, raw, msg in problems:
+            errors.append((section, n, field, raw, msg))
+        if ids is not None:
+            rid = values.get("id")
+            if rid is not None:
+                if rid in ids:
+                    errors.append((section, n, "id", rid, "duplicate id"))
+                ids.add(rid)
+        s, e = values.get("start"), values.get("end")
+        if s is not None and e is not None and e < s:
+            errors.append((section, n, "end", row.get("end") or row.get("endDate"), "is before start"))
+        for field, known, label in refs:
+            v = values.get(field)
+            if v is not None and v not in known:
+                errors.append((section, n, field, v, f"unknown {label} id"))
+
+def _refs(schema, known):
+    """Reference checks declared with "ref"; skipped when the referenced section is absent
+    (items may name a group id without a groups array)."""
+    return tuple((name, known[spec["ref"]], spec["ref"][:-1])
+                 for name, spec in schema.items() if spec.get("ref") in known)
+
+def validate_doc(doc) -> list:
+    """Validate a parsed import document; returns every problem as
+    (section, row number (1-based), field, value, message). Empty list = safe to import."""
+    items_in, groups_in, links_in = locate_rows(doc)
+    if not isinstance(items_in, list):
+        return [("items", 0, "", "", "no 'items' array found")]
+
+    errors, known = [], {}
+    if groups_in is not None:
+        if isinstance(groups_in, list):
+            known["groups"] = set()
+            _run("groups", groups_in, _CHECK_GROUP, errors, ids=known["groups"])
+        else:
+            errors.append(("groups", 0, "", "", "'groups' must be an array"))
+    known["items"] = set()
+    _run("items", items_in, _CHECK_ITEM, errors, _refs(ITEM_SCHEMA, known), known["items"])
+    if links_in is not None:
+        if isinstance(links_in, list):
+            _run("links", links_in, _CHECK_LINK, errors, _refs(LINK_SCHEMA, known))
+        else:
+            errors.append(("links", 0, "", "", "'links' must be an array"))
+    return errors
+
+def summarize(errors, limit: int = 5) -> str:
+    rows = {(e[0], e[1]) for e in errors}
+    head = "; ".join(f"{s} row {n}: {f or 'row'} {m}" for s, n, f, _, m in errors[:limit])
+    more = f" … and {len(errors) - limit} more" if len(errors) > limit else ""
+    return f"{len(errors)} problem(s) in {len(rows)} row(s). {head}{more}"
+
+def errors_to_csv(errors) -> str:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["section", "row", "field", "value", "message"])
+    for section, n, field, value, msg in errors:
+        w.writerow([section, n, field, value if isinstance(value, str) else repr(value), msg])
+    return buf.getvalue()
@@ -0,0 +1,84 @@
+# lib/viewer.py — shared read-only viewer (?view=<roadmap id>)
+# • Roadmaps are JSON or .roadmap files in ROADMAP_DIR (default ./roadmaps), id = file name without extension
+# • .roadmap archives are memory-mapped; ?group=<id>[,<id>…] and ?from=/&to= load only that part
+# • Version = file mtime + size, so an updated file gets a fresh cache entry
+# • Import → enrich → height → HTML happens once per (id, version) for the whole process;
+#   every viewer session reuses the same immutable HTML string
+
+import os
+import re
+from datetime import date
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from lib.archive import RoadmapArchive
+from lib.roadmap import enrich_items, compute_auto_height, initial_window, smart_import_all, smart_import_doc
+from lib.schedule import annotate_critical
+from lib.timeline import build_timeline_html
+
+ROADMAP_DIR = os.environ.get("ROADMAP_DIR", "roadmaps")
+_ID_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+def roadmap_path(roadmap_id: str) -> str | None:
+    """Path of a published roadmap, or None for unknown/unsafe ids."""
+    if not roadmap_id or not _ID_RE.match(roadmap_id) or roadmap_id.startswith("."):
+        return None
+    for ext in (".roadmap", ".json"):
+        path = os.path.join(ROADMAP_DIR, roadmap_id + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def roadmap_version(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_viewer_payload(roadmap_id: str, version: str, groups_only=None, window=None) -> dict:
+    """Build the viewer page once per (id, version, filter). Shared across sessions — treat as read-only."""
+    path = roadmap_path(roadmap_id)
+    if path.endswith(".roadmap"):
+        with RoadmapArchive(path) as ar:
+            items, groups, links = smart_import_doc(ar.to_doc(groups=groups_only, window=window))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            items, groups, links = smart_import_all(f.read())
+    enriched = enrich_items(items, window=window)
+    links_view = annotate_critical(enriched, links)
+    height_px = compute_auto_height(enriched, groups, stack=True)
+    html, H = build_timeline_html(
+        enriched, groups,
+        stack=True,
+        height_px=height_px,
+        window=initial_window(enriched),
+        readonly=True,
+        compact=True,
+        links=links_view,
+    )
+    return {"html": html, "height": H, "items_count": len(items), "groups_count": len(groups)}
+
+def render_viewer(roadmap_id: str) -> None:
+    """Read-only page: title + timeline, no form, picker or export widgets."""
+    path = roadmap_path(roadmap_id)
+    if path is None:
+        st.error(f"Roadmap '{roadmap_id}' not found.")
+        return
+    groups_only, window = None, None
+    if path.endswith(".roadmap"):   # filters use the archive's group/date index
+        qp = st.query_params
+        groups_only = tuple(g for g in qp.get("group", "").split(",") if g) or None
+        if qp.get("from") or qp.get("to"):
+            try:
+                window = (date.fromisoformat(qp.get("from") or "0001-01-01"), date.fromisoformat(qp.get("to") or "9999-12-31"))
+            except ValueError:
+                st.error("Use YYYY-MM-DD for ?from= and ?to=.")
+                return
+    try:
+        payload = load_viewer_payload(roadmap_id, roadmap_version(path), groups_only, window)
+    except ValueError as e:   # ArchiveError (truncated/corrupt .roadmap) or invalid JSON
+        st.error(f"Roadmap '{roadmap_id}' could not be read: {e}.")
+        return
+    st.title(f"🗺️ {roadmap_id}")
+    st.caption(f"Read-only view · {payload['items_count']} items · {payload['groups_count']} groups")
+    components.html(payload["html"], height=payload["height"] + 20, scrolling=False)